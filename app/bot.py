@@ -1,12 +1,12 @@
-from datetime import datetime, timedelta
 import discord
-from discord.ext import commands, tasks
+from discord import app_commands
+from discord.ext import commands
 from app.config import Config
 import os
 from app.utils.logger import logger
 from app.services.database_service import DatabaseService
+from app.services.http_client import http_client
 from app.discord_games.tic_tac_toe.tic_tac_toe import start_tic_tac_toc
-from app.services.emojis_service import EmojiService
 import asyncio
 import json
 
@@ -19,7 +19,6 @@ intents.presences = True  # Enable the presences intent
 
 database = DatabaseService()
 bot = commands.Bot(command_prefix=Config.PREFIX, intents=intents)
-emoji_service = EmojiService()
 
 @bot.event
 async def on_ready():
@@ -40,9 +39,6 @@ async def on_ready():
         logger.error("AlarmCog not found")
 
 
-    # Start the initial delay task
-    bot.loop.create_task(test_initial_delay_and_start_task())
-
     # Sync the slash commands
     try:
         await bot.tree.sync(guild=discord.Object(id=Config.GUILD_ID))
@@ -50,62 +46,6 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}")
 
-######################################################################################
-
-async def test_calculate_initial_delay():
-    now = datetime.now()
-    print(f"Current time: {now}")
-
-    # Start from today at the reference hour
-    reference_time = now.replace(hour=Config.REFERENCE_HOUR, minute=0, second=0, microsecond=0)
-    print(f"Base reference time: {reference_time}")
-    
-    # Calculate all trigger times for the next 24 hours
-    trigger_times = []
-    hours_in_day = 24
-    for i in range(hours_in_day // Config.COOLDOWN_HOURS):
-        trigger_time = reference_time + timedelta(hours=i * Config.COOLDOWN_HOURS)
-        if trigger_time <= now:
-            trigger_time += timedelta(days=1)
-        trigger_times.append(trigger_time)
-    
-    print("Next few trigger times:")
-    for t in trigger_times[:5]:  # Print only the next 5 for brevity
-        print(f"  {t}")
-    
-    # Find the next trigger time
-    next_trigger_time = min(trigger_times)
-    print(f"Next trigger time: {next_trigger_time}")
-    
-    # Calculate the delay
-    initial_delay = (next_trigger_time - now).total_seconds()
-    return initial_delay
-
-async def test_initial_delay_and_start_task():
-    initial_delay = await test_calculate_initial_delay()
-    print(f"Initial delay calculated: {initial_delay:.2f} seconds")
-    print(f"This is approximately {initial_delay / 3600:.2f} hours")
-    
-    # Wait for the initial delay
-    await asyncio.sleep(initial_delay)
-    print("Initial delay complete, starting recurring task")
-
-
-
-
-
-######################################################################################
-
-@tasks.loop(hours=Config.COOLDOWN_HOURS)  # Use the global cooldown interval
-async def update_usages():
-    logger.warning("Updating emoji game usages for all users.")
-    try:
-        emoji_service.update_all_usages()
-        logger.warning("Usages updated successfully.")
-    except Exception as e:
-        logger.error(f"Failed to update usages: {e}")
-
-
 @bot.event
 async def on_command(ctx):
     user = ctx.author
@@ -124,8 +64,14 @@ async def on_command(ctx):
 
 
 @bot.tree.command(name="tic_tac_toe")
-async def tic_tac_toe(interaction: discord.Interaction, difficulty: str):
-    await start_tic_tac_toc(interaction, difficulty)
+@app_commands.describe(board_size="Board size, bigger boards need 4 in a row")
+@app_commands.choices(board_size=[
+    app_commands.Choice(name="3x3 (3 in a row)", value=3),
+    app_commands.Choice(name="4x4 (4 in a row)", value=4),
+    app_commands.Choice(name="5x5 (4 in a row)", value=5),
+])
+async def tic_tac_toe(interaction: discord.Interaction, difficulty: str, board_size: int = 3):
+    await start_tic_tac_toc(interaction, difficulty, board_size)
 
 async def load_cogs():
     cogs_loaded = []
@@ -162,8 +108,12 @@ def verify_json_files():
 async def main():
     verify_json_files()  # Add this line before loading cogs
     async with bot:
-        await load_cogs()
-        await bot.start(Config.DISCORD_TOKEN)
+        await http_client.start()
+        try:
+            await load_cogs()
+            await bot.start(Config.DISCORD_TOKEN)
+        finally:
+            await http_client.close()
 
 if __name__ == "__main__":
     import asyncio
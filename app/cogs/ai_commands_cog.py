@@ -1,26 +1,38 @@
 import asyncio
 import discord
 from discord.ext import commands
-import requests
-from app.utils.ai_related.groq_api import send_to_groq, send_to_groq_vision
+from app.utils.ai_related.groq_api import send_to_groq_hedged, send_to_groq_vision
 from app.utils.ai_related.groq_service import GroqService
 from app.utils.ai_related.chatgpt_api import send_to_openai_vision, send_to_openai_gpt, send_to_openai, ask_gpt
+from app.utils.ai_related.token_estimator import estimate_messages_tokens, estimate_tokens, IMAGE_TOKENS
+from app.services.token_ledger_service import token_ledger
 from app.utils.logger import logger
 from app.utils.command_utils import custom_command
+from app.config import Config
 import os
 
 class AICommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.groq_service = GroqService(bot)  
-         
+        self.token_ledger = token_ledger
+
+    async def has_token_quota(self, ctx, estimated_tokens):
+        """Checks the user's daily token quota before we send anything to the AI."""
+        allowed, used, daily_limit = self.token_ledger.check_quota(ctx.author.id, estimated_tokens)
+        if not allowed:
+            logger.info(f"User {ctx.author.name} is over token quota: {used}/{daily_limit}")
+            await ctx.send(f"You've used {used}/{daily_limit} AI tokens today. Come back tomorrow! <:kiana:496046467090219040>")
+        return allowed
 
     @commands.hybrid_command(name='ask', help="Ask a question to the AI.")
     async def ask(self, ctx, *, question):
         try:
             logger.debug(f"------- \nCommand ASK used by user {ctx.author.name}")
             messages = await self.groq_service.ask_question(ctx.author.name, ctx.author.id, question)
-            response, _, _, _ = send_to_groq(messages)
+            if not await self.has_token_quota(ctx, estimate_messages_tokens(messages)):
+                return
+            response, _, _, _ = await send_to_groq_hedged(messages, ctx.author.id, "ask")
             logger.debug(f"Sending response: {response}\n-------------")
             await ctx.send(response)
         except Exception as ex:
@@ -35,7 +47,9 @@ class AICommands(commands.Cog):
             logger.debug(f"------- \nCommand CHAT used by user {ctx.author.name}")
             messages = await self.groq_service.assemble_chat_history(ctx)
             messages = await self.groq_service.add_command_messages(ctx, messages, question)
-            response, prompt_tokens, completion_tokens, total_tokens = send_to_groq(messages)
+            if not await self.has_token_quota(ctx, estimate_messages_tokens(messages)):
+                return
+            response, prompt_tokens, completion_tokens, total_tokens = await send_to_groq_hedged(messages, ctx.author.id, "chat")
             logger.info(f"Prompt tokens: {prompt_tokens}")
             logger.info(f"Completion tokens: {completion_tokens}")
             logger.info(f"Total tokens: {total_tokens}")
@@ -50,6 +64,8 @@ class AICommands(commands.Cog):
         try:
             logger.debug(f"------- \nCommand ASK used by user {ctx.author.name}")
             messages = await ask_gpt(ctx.author.name, ctx.author.id, question)
+            if not await self.has_token_quota(ctx, estimate_messages_tokens(messages)):
+                return
             
             # Defer the response to avoid timeout
             await ctx.defer()
@@ -59,7 +75,7 @@ class AICommands(commands.Cog):
 
             try:
                 # Await the send_to_openai function with a timeout
-                response = await asyncio.wait_for(send_to_openai_gpt(messages), timeout=20.0)
+                response = await asyncio.wait_for(send_to_openai_gpt(messages, ctx.author.id, "askgpt"), timeout=20.0)
             except asyncio.TimeoutError:
                 await thinking_message.delete()
                 await ctx.send("Sorry, the request timed out. Please try again.")
@@ -118,7 +134,9 @@ class AICommands(commands.Cog):
         try:
             logger.debug(f"------- \nCommand ASK used by user {ctx.author.name}")
             messages = await self.groq_service.ask_question(ctx.author.name, ctx.author.id, question)
-            response, _, _, _ = send_to_openai(messages)
+            if not await self.has_token_quota(ctx, estimate_messages_tokens(messages)):
+                return
+            response, _, _, _ = send_to_openai(messages, ctx.author.id, "oldask")
             logger.debug(f"Sending response: {response}\n-------------")
             await ctx.send(response)
         except Exception as ex:
@@ -134,7 +152,9 @@ class AICommands(commands.Cog):
             
             messages = await self.groq_service.assemble_chat_history(ctx)
             messages = await self.groq_service.add_command_messages(ctx, messages, question)
-            response, prompt_tokens, completion_tokens, total_tokens = send_to_openai(messages)
+            if not await self.has_token_quota(ctx, estimate_messages_tokens(messages)):
+                return
+            response, prompt_tokens, completion_tokens, total_tokens = send_to_openai(messages, ctx.author.id, "oldchat")
             logger.info(f"Prompt tokens: {prompt_tokens}")
             logger.info(f"Completion tokens: {completion_tokens}")
             logger.info(f"Total tokens: {total_tokens}")
@@ -154,11 +174,13 @@ class AICommands(commands.Cog):
                 attachment = ctx.message.attachments[0]
 
             if attachment:
+                if not await self.has_token_quota(ctx, estimate_tokens(question) + IMAGE_TOKENS):
+                    return
                 await ctx.defer()  # Defer the response to avoid timeout
                 attachment_url = attachment.url  # Get the attachment's URL
                 
                 # Correctly await and unpack the response
-                response = await send_to_openai_vision(question, attachment_url)
+                response = await send_to_openai_vision(question, attachment_url, ctx.author.id, "vision")
                 
                 if isinstance(response, tuple):
                     response, _, _, _ = response
@@ -191,11 +213,13 @@ class AICommands(commands.Cog):
             attachment = ctx.message.attachments[0]
             attachment_url = attachment.url  # Get the attachment's URL
             logger.debug(f"Attachment URL: {attachment_url}")
+            if not await self.has_token_quota(ctx, estimate_tokens(question) + IMAGE_TOKENS):
+                return
             
             await ctx.defer()  # Defer response to avoid timeout
             
             # Send the question and attachment URL to your processing function
-            response = await send_to_groq_vision(question, attachment_url)
+            response = await send_to_groq_vision(question, attachment_url, ctx.author.id, "groq_vision")
             
             if isinstance(response, tuple):
                 response, _, _, _ = response
@@ -217,6 +241,41 @@ class AICommands(commands.Cog):
 
 
 
+    @commands.command(name='tokenusage', help="Shows AI token usage for a day. Usage: +tokenusage [YYYY-MM-DD]")
+    async def token_usage(self, ctx, day: str = None):
+        if ctx.author.id != Config.master_user_id:
+            await ctx.send("You do not have permission to use this command.")
+            return
+
+        day = day or self.token_ledger.today()
+        rows = self.token_ledger.get_daily_usage(day)
+        if not rows:
+            await ctx.send(f"No AI token usage recorded for {day}.")
+            return
+
+        total_tokens = sum(prompt + completion for _, _, _, prompt, completion, _ in rows)
+        embed = discord.Embed(title=f"AI token usage for {day}", description=f"Total: **{total_tokens}** tokens", color=discord.Color.blue())
+        lines = []
+        for user_id, command, model, prompt_tokens, completion_tokens, requests_count in rows[:20]:
+            user = f"<@{user_id}>" if user_id else "system"
+            lines.append(f"{user} | {command} | {model} | {prompt_tokens}+{completion_tokens} tokens | {requests_count}x")
+        embed.add_field(name="Usage", value="\n".join(lines)[:1024], inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command(name='tokenquota', help="Sets a daily AI token quota for a user, 0 removes it. Usage: +tokenquota @user 20000")
+    async def token_quota(self, ctx, member: discord.Member, daily_limit: int):
+        if ctx.author.id != Config.master_user_id:
+            await ctx.send("You do not have permission to use this command.")
+            return
+
+        self.token_ledger.set_quota(member.id, daily_limit)
+        used = self.token_ledger.get_user_usage_today(member.id)
+        if daily_limit > 0:
+            await ctx.send(f"Daily AI token quota for {member.display_name} set to {daily_limit} (used today: {used}).")
+        else:
+            await ctx.send(f"Custom AI token quota for {member.display_name} removed (used today: {used}).")
+
+
 async def setup(bot):
     logger.info("Setting up AICommands cog...")
     cog = AICommands(bot)
@@ -1,12 +1,16 @@
 from datetime import datetime
-from discord.ext import commands
+from discord.ext import commands, tasks
 import discord
 import asyncio
 import re
 import logging
 import time
+from app.config import Config
 from app.services.database_service import DatabaseService
 from app.utils.logger import logger
+from app.utils.timer_scheduler import TimerScheduler
+
+MESSAGE_LIMIT = 2000
 
 
 class AlarmCog(commands.Cog):
@@ -15,7 +19,19 @@ class AlarmCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.database = DatabaseService()
-        self.alarms = {}
+        # only alarms due within the load window are kept in the scheduler, load_alarms tops it up from SQLite
+        self.scheduler = TimerScheduler("Alarm", self.fire_alarm)
+        self.loaded_until = 0  # alarms with trigger_time up to here are in the scheduler (or were already sent)
+        self.missed_alarms_task = None
+
+    async def cog_load(self):
+        self.scheduler.start()
+
+    def cog_unload(self):
+        self.load_alarms.cancel()
+        self.scheduler.stop()
+        if self.missed_alarms_task:
+            self.missed_alarms_task.cancel()
 
     @commands.hybrid_command(name='alarmhelp', help="Show the alarm help message.")
     async def show_alarm_help(self, ctx):
@@ -55,9 +71,9 @@ class AlarmCog(commands.Cog):
                 await ctx.send("You have reached the maximum limit of 10 active alarms.")
                 return
 
-            task = self.bot.loop.create_task(self.start_alarm(ctx, trigger_time, note))
             alarm_id = self.database.insert_alarm(user_id, channel_id, trigger_time, note)
-            self.alarms[alarm_id] = task
+            if trigger_time <= self.loaded_until:
+                self.scheduler.schedule(alarm_id, trigger_time)
             await ctx.send(f"Alarm set for {time_str}. I will notify you when the time is up. Note: {note}")
 
         except ValueError as e:
@@ -74,13 +90,9 @@ class AlarmCog(commands.Cog):
 
         alarm_id = user_alarms[dynamic_id - 1][0]  # Get the actual alarm ID from the dynamic ID
 
-        if alarm_id in self.alarms:
-            self.alarms[alarm_id].cancel()
-            self.database.delete_alarm(alarm_id)
-            del self.alarms[alarm_id]
-            await ctx.send(f"Alarm {dynamic_id} has been cancelled, {ctx.message.author.mention}.")
-        else:
-            await ctx.send(f"Alarm {dynamic_id} does not exist, {ctx.message.author.mention}.")
+        self.scheduler.cancel(alarm_id)
+        self.database.delete_alarm(alarm_id)
+        await ctx.send(f"Alarm {dynamic_id} has been cancelled, {ctx.message.author.mention}.")
 
     @commands.hybrid_command(name='alarmlist', help="List all active alarms for the user.")
     async def alarm_list(self, ctx):
@@ -121,28 +133,37 @@ class AlarmCog(commands.Cog):
         user_id = ctx.message.author.id
         user_alarms = self.database.get_user_alarms(user_id)
         for alarm in user_alarms:
-            alarm_id = alarm[0]
-            if alarm_id in self.alarms:
-                self.alarms[alarm_id].cancel()
-                del self.alarms[alarm_id]
+            self.scheduler.cancel(alarm[0])
         self.database.delete_user_alarms(user_id)
         await ctx.send(f"All alarms have been cancelled, {ctx.message.author.mention}.")
 
-    async def start_alarm(self, ctx, trigger_time, note):
-        await asyncio.sleep(max(0, trigger_time - int(time.time())))
-        await ctx.send(f"{ctx.message.author.mention} Time's up! Note: {note}")
-        user_id = ctx.message.author.id
-        alarm_id = self.get_alarm_id_by_user_time(user_id, trigger_time)
-        if alarm_id in self.alarms:
-            del self.alarms[alarm_id]
-            self.database.delete_alarm(alarm_id)
-
-    def get_alarm_id_by_user_time(self, user_id, trigger_time):
-        alarms = self.database.get_user_alarms(user_id)
-        for alarm in alarms:
-            if alarm[1] == trigger_time:
-                return alarm[0]
-        return None
+    async def fire_alarm(self, alarm_id):
+        """Scheduler callback: sends the alarm and deletes it. The alarm may have been stopped in the meantime."""
+        alarm = self.database.get_alarm(alarm_id)
+        if alarm is None:
+            return
+        user_id, channel_id, trigger_time, note = alarm
+        channel = self.bot.get_channel(channel_id)
+        if channel:
+            await channel.send(f"<@{user_id}> Time's up! Note: {note}")
+        else:
+            logger.error(f"Channel {channel_id} not found for alarm {alarm_id}")
+        self.database.delete_alarm(alarm_id)
+
+    @tasks.loop(minutes=Config.ALARM_LOAD_WINDOW_MINUTES / 2)
+    async def load_alarms(self):
+        """Moves the alarms due within the load window from SQLite into the scheduler.
+
+        Runs twice per window, so every alarm is loaded at least half a window before it is due.
+        """
+        try:
+            until = int(time.time()) + Config.ALARM_LOAD_WINDOW_MINUTES * 60
+            for alarm_id, trigger_time in self.database.get_alarm_times_between(self.loaded_until, until):
+                self.scheduler.schedule(alarm_id, trigger_time)
+            self.loaded_until = until
+            logger.info(f"{len(self.scheduler)} alarms scheduled until {datetime.fromtimestamp(until)}")
+        except Exception as e:
+            logger.error(f"Error while loading alarms: {e}")
 
     def extract_time_and_note(self, args):
         """Extract time and note from arguments."""
@@ -186,49 +207,69 @@ class AlarmCog(commands.Cog):
 
 
     async def check_existing_alarms(self):
-        """Check for existing alarms in the database and schedule them."""
-        logger.info("Retrieving alarms from the database...")
+        """Sends the alarms missed while the bot was offline and starts loading upcoming ones into the scheduler."""
+        if self.load_alarms.is_running():
+            return  # on_ready runs again after every reconnect
+        logger.info("Retrieving missed alarms from the database...")
         try:
-            alarms = self.database.get_alarms()
-            logger.info(f"Retrieved {len(alarms)} alarms from the database.")
             current_time = int(time.time())
-            for alarm_id, user_id, channel_id, trigger_time, note in alarms:
-                logger.info(f"Processing alarm: {alarm_id}, User: {user_id}, Channel: {channel_id}, Time: {trigger_time}, Note: {note}")
-                channel = self.bot.get_channel(channel_id)
-                if not channel:
-                    logger.error(f"Channel {channel_id} not found for alarm {alarm_id}")
-                    continue
-                
-                if trigger_time <= current_time:
-                    # Alarm time has passed, send a notification after a short delay
-                    logger.info(f"Alarm {alarm_id} time has passed. Scheduling missed alarm notification.")
-                    self.bot.loop.create_task(self.send_missed_alarm(channel, user_id, trigger_time, note, alarm_id))
-                else:
-                    # Schedule future alarms
-                    logger.info(f"Scheduling future alarm: {alarm_id}")
-                    task = self.bot.loop.create_task(self.resume_alarm(channel, user_id, trigger_time, note, alarm_id))
-                    self.alarms[alarm_id] = task
-            logger.info("Completed checking existing alarms.")
+            alarms = self.database.get_alarms_due(current_time)
+            self.loaded_until = current_time  # everything due by now is handled here, the scheduler takes the rest
+            logger.info(f"Retrieved {len(alarms)} missed alarms from the database.")
+            if alarms:
+                self.missed_alarms_task = self.bot.loop.create_task(self.send_missed_alarms(alarms))
         except Exception as e:
             logger.error(f"Error while checking existing alarms: {e}")
-
-    async def send_missed_alarm(self, channel, user_id, trigger_time, note, alarm_id):
-        try:
-            await asyncio.sleep(10)  # Wait for the bot to start successfully
-            await channel.send(f"<@{user_id}> Your alarm was missed while the bot was offline. Note: {note}")
-            self.database.delete_alarm(alarm_id)
-        except Exception as e:
-            logger.error(f"Error while sending missed alarm: {e}")
-
-    async def resume_alarm(self, channel, user_id, trigger_time, note, alarm_id):
-        try:
-            await asyncio.sleep(max(0, trigger_time - int(time.time())))
-            await channel.send(f"<@{user_id}> Time's up! Note: {note}")
-            if alarm_id in self.alarms:
-                del self.alarms[alarm_id]
-                self.database.delete_alarm(alarm_id)
-        except Exception as e:
-            logger.error(f"Error while resuming alarm: {e}")
+        self.load_alarms.start()
+
+    def build_missed_alarm_messages(self, alarms):
+        """Groups missed alarms into one digest per channel, each user's alarms together, split at Discord's limit.
+
+        Returns [(channel_id, text, alarm ids covered by text)].
+        """
+        by_channel = {}
+        for alarm_id, user_id, channel_id, trigger_time, note in alarms:
+            by_channel.setdefault(channel_id, {}).setdefault(user_id, []).append((alarm_id, trigger_time, note))
+
+        messages = []
+        header = "⏰ Alarms missed while I was offline:"
+        for channel_id, by_user in by_channel.items():
+            text, alarm_ids = header, []
+            for user_id, user_alarms in by_user.items():
+                for alarm_id, trigger_time, note in user_alarms:
+                    if len(note) > 200:
+                        note = note[:200] + "..."
+                    when = datetime.fromtimestamp(trigger_time).strftime('%Y-%m-%d %H:%M')
+                    line = f"\n<@{user_id}> **{when}** {note}"
+                    if len(text) + len(line) > MESSAGE_LIMIT:
+                        messages.append((channel_id, text, alarm_ids))
+                        text, alarm_ids = header, []
+                    text += line
+                    alarm_ids.append(alarm_id)
+            messages.append((channel_id, text, alarm_ids))
+        return messages
+
+    async def send_missed_alarms(self, alarms):
+        """Sends the missed alarm digests one at a time, paced to stay clear of Discord's rate limits. Each digest's
+        alarms are deleted as soon as it is sent, so a restart halfway through doesn't send them again. Alarms whose
+        channel is gone stay in the database.
+        """
+        await asyncio.sleep(10)  # Wait for the bot to start successfully
+        delivered = 0
+        for channel_id, text, alarm_ids in self.build_missed_alarm_messages(alarms):
+            channel = self.bot.get_channel(channel_id)
+            if not channel:
+                logger.error(f"Channel {channel_id} not found for {len(alarm_ids)} missed alarms")
+                continue
+            try:
+                await channel.send(text)
+            except discord.HTTPException as e:
+                logger.error(f"Error while sending missed alarms to channel {channel_id}: {e}")
+            else:
+                self.database.delete_alarms(alarm_ids)
+                delivered += len(alarm_ids)
+            await asyncio.sleep(Config.ALARM_MISSED_SEND_INTERVAL)
+        logger.info(f"Delivered {delivered} of {len(alarms)} missed alarms")
 
 async def setup(bot):
     await bot.add_cog(AlarmCog(bot))
\ No newline at end of file
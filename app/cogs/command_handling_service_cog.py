@@ -9,7 +9,9 @@ from app.config import Config
 from app.utils.logger import logger
 from datetime import datetime
 from app.utils.ai_related.groq_service import GroqService
-from app.utils.ai_related.groq_api import send_to_groq
+from app.utils.ai_related.groq_api import send_to_groq_hedged
+from app.utils.ai_related.token_estimator import estimate_messages_tokens
+from app.services.token_ledger_service import token_ledger
 
 class CommandHandlingService(commands.Cog):
     def __init__(self, bot):
@@ -128,7 +130,11 @@ class CommandHandlingService(commands.Cog):
                 })
 
                 # Get and send response
-                response, _, _, _ = send_to_groq(messages)
+                allowed, used, daily_limit = token_ledger.check_quota(message.author.id, estimate_messages_tokens(messages))
+                if not allowed:
+                    await message.channel.send(f"You've used {used}/{daily_limit} AI tokens today. Come back tomorrow! <:kiana:496046467090219040>")
+                    return True
+                response, _, _, _ = await send_to_groq_hedged(messages, message.author.id, "reply")
                 
                 if len(response) > 2000:
                     for i in range(0, len(response), 2000):
@@ -170,7 +176,11 @@ class CommandHandlingService(commands.Cog):
                     messages = await self.groq_service.add_command_messages(message, messages, content)
                     
                     # Get and send response
-                    response, _, _, _ = send_to_groq(messages)
+                    allowed, used, daily_limit = token_ledger.check_quota(message.author.id, estimate_messages_tokens(messages))
+                    if not allowed:
+                        await message.channel.send(f"You've used {used}/{daily_limit} AI tokens today. Come back tomorrow! <:kiana:496046467090219040>")
+                        return
+                    response, _, _, _ = await send_to_groq_hedged(messages, message.author.id, "mention")
                     
                     if len(response) > 2000:
                         for i in range(0, len(response), 2000):
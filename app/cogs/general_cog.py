@@ -4,6 +4,7 @@ from app.config import Config
 from app.utils.logger import logger
 from app.cogs.command_handling_service_cog import CommandHandlingService
 from app.utils.command_utils import custom_command
+from app.utils.metrics import metrics
 class General(commands.Cog):
     def __init__(self, bot):
         try:
@@ -46,6 +47,26 @@ class General(commands.Cog):
         else:
             await ctx.send("You do not have permission to use this command.")
 
+    @commands.command(name='metrics', hidden=True)
+    async def show_metrics(self, ctx, prefix: str = ""):
+        if ctx.author.id != self.config.master_user_id:
+            await ctx.send("You do not have permission to use this command.")
+            return
+
+        values = metrics.snapshot(prefix)
+        if not values:
+            await ctx.send("No metrics recorded yet.")
+            return
+
+        lines = [f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}" for name, value in values.items()]
+        message = ""
+        for line in lines:
+            if len(message) + len(line) > 1900:
+                await ctx.send(f"```{message}```")
+                message = ""
+            message += line + "\n"
+        await ctx.send(f"```{message}```")
+
     @commands.command(name='shutdown', hidden=True)
     async def shutdown(self, ctx):
         if ctx.author.id != self.config.master_user_id:
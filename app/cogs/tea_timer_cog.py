@@ -1,12 +1,34 @@
 import discord
 from discord.ext import commands
 import asyncio
+from app.services.database_service import DatabaseService
+from app.utils.logger import logger
+from app.utils.timer_scheduler import TimerScheduler
 
 class TeaTimerCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.tea_timers = {}  # {user_id: (timer, end_time)}
-        self.default_times = {}  # {user_id: default_time_in_seconds}
+        self.database = DatabaseService()
+        # timers and defaults live in SQLite, the scheduler holds the running timers keyed by user id
+        self.tea_timers = TimerScheduler("Tea", self.tea_ready)
+        self.default_times = {}  # {user_id: default_time_in_seconds}, loaded from the database
+
+    async def cog_load(self):
+        self.default_times = dict(self.database.get_tea_defaults())
+        self.tea_timers.start()
+        self.restore_task = asyncio.create_task(self.restore_timers())
+
+    def cog_unload(self):
+        self.restore_task.cancel()
+        self.tea_timers.stop()
+
+    async def restore_timers(self):
+        """Puts the timers that were running before a restart back on the scheduler, once channels are known."""
+        await self.bot.wait_until_ready()
+        timers = self.database.get_tea_timers()
+        for user_id, end_time in timers:
+            self.tea_timers.schedule(user_id, end_time)
+        logger.info(f"Restored {len(timers)} tea timers")
 
     def parse_time(self, time_str):
         # Replace ',' or '.' with ':' for uniform handling
@@ -49,29 +71,45 @@ class TeaTimerCog(commands.Cog):
                 await ctx.send("Invalid time format. Please use 'm:ss', 'm.ss', 'm,ss' or 'm'")
                 return
 
-        # Cancel existing timer if any
-        if user_id in self.tea_timers:
-            self.tea_timers[user_id][0].cancel()
-
-        # Start new timer
+        # Start new timer, replacing the existing one if any
         end_time = ctx.message.created_at.timestamp() + seconds
-        timer = asyncio.create_task(self.tea_timer(ctx, seconds))
-        self.tea_timers[user_id] = (timer, end_time)
+        self.database.set_tea_timer(user_id, ctx.channel.id, end_time)
+        self.tea_timers.schedule(user_id, end_time)
 
         await ctx.send(f"Tea timer set for {seconds // 60}:{seconds % 60:02d}.")
 
-    async def tea_timer(self, ctx, seconds):
-        await asyncio.sleep(seconds)
-        await ctx.send(f"{ctx.author.mention}, your tea is ready!")
-        del self.tea_timers[ctx.author.id]
+    async def tea_ready(self, user_id):
+        """Scheduler callback for a finished timer."""
+        if user_id in self.tea_timers:
+            # a new +tea came in between the timer firing and this callback, the saved row belongs to that one
+            return
+        timer = self.database.get_tea_timer(user_id)
+        if timer is None:
+            return
+        channel_id, _ = timer
+        self.database.delete_tea_timer(user_id)
+        message = f"<@{user_id}>, your tea is ready!"
+        # DM channels aren't cached after a restart, so fall back to fetching the channel, then to DMing the user
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+            except discord.HTTPException as e:
+                logger.warning(f"Channel {channel_id} of the tea timer of user {user_id} unavailable ({e}), sending a DM")
+        try:
+            if channel is None:
+                channel = await self.bot.fetch_user(user_id)
+            await channel.send(message)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to notify user {user_id} that their tea is ready: {e}")
 
     @commands.hybrid_command(name='teahelp', help="Show current tea timer status")
     async def teahelp(self, ctx):
         user_id = ctx.author.id
         embed = discord.Embed(title="Tea Timer Help", color=discord.Color.green())
 
-        if user_id in self.tea_timers:
-            _, end_time = self.tea_timers[user_id]
+        end_time = self.tea_timers.deadline(user_id)
+        if end_time is not None:
             remaining = max(0, int(end_time - ctx.message.created_at.timestamp()))
             embed.add_field(name="Current Timer", value=f"{remaining // 60}:{remaining % 60:02d}")
         else:
@@ -89,6 +127,7 @@ class TeaTimerCog(commands.Cog):
     async def settea(self, ctx, time_str: str):
         try:
             seconds = self.parse_time(time_str)
+            self.database.set_tea_default(ctx.author.id, seconds)
             self.default_times[ctx.author.id] = seconds
             await ctx.send(f"Default tea timer set to {seconds // 60}:{seconds % 60:02d}.")
         except ValueError:
@@ -97,9 +136,8 @@ class TeaTimerCog(commands.Cog):
     @commands.hybrid_command(name='stoptea', help="Stop the current tea timer")
     async def stoptea(self, ctx):
         user_id = ctx.author.id
-        if user_id in self.tea_timers:
-            self.tea_timers[user_id][0].cancel()
-            del self.tea_timers[user_id]
+        if self.tea_timers.cancel(user_id):
+            self.database.delete_tea_timer(user_id)
             await ctx.send("Tea timer stopped.")
         else:
             await ctx.send("No active tea timer to stop.")
@@ -1,27 +1,37 @@
 import discord
 from discord.ext import commands
 import random
-import aiohttp
+from app.services.http_client import http_client
+from app.services.response_cache import CachePolicy, response_cache
+
+# numbersapi knows several facts per number and answers with one at random, so a few answers are kept per number
+NUMBER_FACT_POLICY = CachePolicy(ttl=24 * 3600, stale_ttl=7 * 24 * 3600, negative_ttl=3600, variants=5)
+RANDOM_NUMBER_FACT_POLICY = CachePolicy(ttl=3600, variants=20)  # no number given (or "random"), numbersapi picks one
+FACT_BATCH_POLICY = CachePolicy(ttl=3600, stale_ttl=24 * 3600)  # cat/dog facts come in batches, one is picked per use
+FACT_BATCH_SIZE = 50
 
 class TriviaApis:
-    async def fetch(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.content_type == 'application/json':
-                    return await response.json()
-                return await response.text()
+    async def fetch(self, url, endpoint=None, policy=None, params=None):
+        if policy is None:
+            response = await http_client.get(url, params=params)
+        else:
+            response = await response_cache.get(endpoint, url, policy, params)
+        if response.content_type == 'application/json':
+            return response.json()
+        return response.text()
 
     async def number_api_result(self, number, trivia_type):
         url = f"http://numbersapi.com/{number}/{trivia_type}"
-        return await self.fetch(url)
+        is_random = not number or str(number).lower() == "random"
+        return await self.fetch(url, "numbersapi", RANDOM_NUMBER_FACT_POLICY if is_random else NUMBER_FACT_POLICY)
 
     async def meow_api_result(self):
         url = "https://meowfacts.herokuapp.com/"
-        return await self.fetch(url)
+        return await self.fetch(url, "meowfacts", FACT_BATCH_POLICY, {"count": FACT_BATCH_SIZE})
 
     async def dogs_api_result(self):
         url = "https://dog-api.kinduff.com/api/facts"
-        return await self.fetch(url)
+        return await self.fetch(url, "dogfacts", FACT_BATCH_POLICY, {"number": FACT_BATCH_SIZE})
 
     async def jservice_api_result(self, category_id):
         url = f"https://jservice.io/api/random?count=1&category={category_id}"
@@ -42,8 +52,8 @@ class TriviaModule(commands.Cog):
     @commands.command(name='cats', help='Random facts about cats. Meow!')
     async def cats(self, ctx: commands.Context):
         result = await self.trivia_apis.meow_api_result()
-        if isinstance(result, dict) and 'data' in result:
-            fact = result['data'][0]
+        if isinstance(result, dict) and result.get('data'):
+            fact = random.choice(result['data'])
         else:
             fact = "No fact available at the moment."
         await ctx.send(f"🐱 **Cat Fact**: {fact}")
@@ -52,8 +62,8 @@ class TriviaModule(commands.Cog):
     @commands.command(name='dogs', help='Mad barkers trivias!')
     async def dogs(self, ctx: commands.Context):
         result = await self.trivia_apis.dogs_api_result()
-        if isinstance(result, dict) and 'facts' in result:
-            fact = result['facts'][0]
+        if isinstance(result, dict) and result.get('facts'):
+            fact = random.choice(result['facts'])
         else:
             fact = "No fact available at the moment."
         await ctx.send(f"🐶 **Dog Fact**: {fact}")
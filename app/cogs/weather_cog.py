@@ -1,7 +1,6 @@
-import os
-import time
 import discord
-from discord.ext import commands, tasks
+from io import BytesIO
+from discord.ext import commands
 from app.utils.logger import logger
 from app.services.weather_service import WeatherService
 
@@ -9,23 +8,6 @@ class WeatherCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.weather_service = WeatherService()
-        self.map_cache = {}
-        self.map_cleaner.start()
-
-    def cog_unload(self):
-        self.map_cleaner.cancel()
-
-    @tasks.loop(minutes=1)
-    async def map_cleaner(self):
-        #logger.info("Running map cache cleaner")
-        current_time = time.time()
-        for key, (timestamp, _) in list(self.map_cache.items()):
-            if current_time - timestamp > 600:  # 10 minutes
-                file_path = self.map_cache[key][1]
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Removed map cache file: {file_path}")
-                del self.map_cache[key]
 
     @commands.hybrid_command(name='weather', help="Fetches and displays weather information for a specified city.")
     async def weather(self, ctx, *, city: str):
@@ -58,10 +40,10 @@ class WeatherCog(commands.Cog):
                 embed = self.create_weather_embed(city, weather_data)
                 
                 zoom = self.get_zoom_level(map_size)
-                map_path = await self.get_or_create_map(city, weather_data['lat'], weather_data['lon'], zoom)
+                map_bytes = await self.weather_service.create_centered_weather_map(weather_data['lat'], weather_data['lon'], zoom, city)
                 
-                if map_path:
-                    file = discord.File(map_path, filename="weather_map.png")
+                if map_bytes:
+                    file = discord.File(BytesIO(map_bytes), filename="weather_map.png")
                     embed.set_image(url="attachment://weather_map.png")
                     await ctx.send(embed=embed, file=file)
                 else:
@@ -146,24 +128,5 @@ class WeatherCog(commands.Cog):
     def get_zoom_level(map_size):
         return {'small': 4, 'medium': 5, 'big': 7}[map_size]
 
-    async def get_or_create_map(self, city, lat, lon, zoom):
-        cache_key = f"{city}_{zoom}"
-        current_time = time.time()
-
-        if cache_key in self.map_cache:
-            self.map_cache[cache_key] = (current_time, self.map_cache[cache_key][1])
-            return self.map_cache[cache_key][1]
-
-        map_path = f'app/services/weather_data/{cache_key}.png'
-        weather_map = await self.weather_service.create_centered_weather_map(lat, lon, zoom, city)
-        
-        if weather_map:
-            os.makedirs('app/services/weather_data', exist_ok=True)
-            with open(map_path, 'wb') as f:
-                f.write(weather_map.getvalue())
-            self.map_cache[cache_key] = (current_time, map_path)
-            return map_path
-        return None
-
 async def setup(bot: commands.Bot):
     await bot.add_cog(WeatherCog(bot))
\ No newline at end of file
@@ -25,6 +25,12 @@ class Config:
     LOKI_URL = os.getenv('LOKI_URL', 'http://localhost:3100')
     PREFIX = os.getenv('PREFIX', '+')
     ENVIROMENT = os.getenv('ENVIROMENT', 'production')
+    # AI provider hedging - fire a backup request if Groq is slower than this percentile of recent latencies
+    AI_HEDGING_ENABLED = os.getenv('AI_HEDGING_ENABLED', 'false').lower() == 'true'
+    AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', '0.95'))
+    AI_HEDGE_DEFAULT_DELAY = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', '5'))  # seconds, used until we have enough samples
+    AI_FALLBACK_OPENAI_MODEL = os.getenv('AI_FALLBACK_OPENAI_MODEL', 'gpt-4o-mini')
+    AI_DAILY_TOKEN_QUOTA = int(os.getenv('AI_DAILY_TOKEN_QUOTA', '0'))  # default per user daily token limit, 0 = unlimited
     master_user_id = int(os.getenv('MASTER_USER_ID'))
     nequs_id = int(os.getenv('NEQUS_ID'))
     # Game configuration
@@ -32,7 +38,41 @@ class Config:
     # Alternatively, use hours if you decide to use a longer interval
     COOLDOWN_HOURS = 4 # Example value for a 3-hour cooldown
     REFERENCE_HOUR = 0  # Reference hour to start the intervals
+    EMOJI_POOL_LOW_WATER_MARK = 10  # refill the pre-generated emoji question pool below this many questions
+    EMOJI_POOL_TARGET_SIZE = 25
+    EMOJI_POOL_REFILL_MINUTES = 10
+    EMOJI_GAME_TTL_MINUTES = 60  # unanswered emoji questions expire after this long
+    EMOJI_GAME_MAX_ACTIVE = 1000
+    EMOJI_GAME_SWEEP_MINUTES = 5
+    EMOJI_GAME_SNAPSHOT = os.getenv('EMOJI_GAME_SNAPSHOT', 'true').lower() == 'true'  # keep active games across restarts
+
+    # seconds the engine may think on 4x4/5x5 boards, capped so the move stays inside Discord's 3s interaction deadline
+    TIC_TAC_TOE_MOVE_BUDGET = min(float(os.getenv('TIC_TAC_TOE_MOVE_BUDGET', '1.0')), 1.5)
+    # nodes the engine may search per move, a fixed amount of work so a seeded game replays the same way;
+    # the time budget above only cuts in on hosts too slow to get through them in time
+    TIC_TAC_TOE_MOVE_NODES = int(os.getenv('TIC_TAC_TOE_MOVE_NODES', '20000'))
+    TIC_TAC_TOE_SESSION_TTL_HOURS = 24  # unfinished games nobody touched for this long are dropped
+    TIC_TAC_TOE_FLUSH_SECONDS = 5  # how often changed games are saved to SQLite
+    TIC_TAC_TOE_COMMENT_TIMEOUT = 8  # seconds to wait for aichan's LLM comment before keeping the template one
+    TIC_TAC_TOE_LLM_COMMENTS = os.getenv('TIC_TAC_TOE_LLM_COMMENTS', 'true').lower() == 'true'  # false = template comments only
+
+    ALARM_LOAD_WINDOW_MINUTES = 60  # alarms due within this window are held in memory, later ones stay in SQLite
+    ALARM_MISSED_SEND_INTERVAL = 1.0  # seconds between missed alarm digests after a restart
+
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))  # seconds, default for every outbound request
+    HTTP_RETRIES = 2  # extra attempts for GET requests that failed to connect, timed out or got a 429/5xx
+    HTTP_BACKOFF_SECONDS = 0.5
+    HTTP_MAX_CONNECTIONS = 100
+    HTTP_MAX_CONNECTIONS_PER_HOST = 10
 
     EMOJI_API_KEY = os.getenv('EMOJI_API_KEY')
     OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
-    TOMORROW_API_KEY= os.getenv('TOMORROW_API_KEY')
\ No newline at end of file
+    TOMORROW_API_KEY= os.getenv('TOMORROW_API_KEY')
+    WEATHER_TILE_TIMEOUT = float(os.getenv('WEATHER_TILE_TIMEOUT', '5'))  # seconds per map tile download, slow tiles are left out
+    WEATHER_TILE_CACHE_MB = int(os.getenv('WEATHER_TILE_CACHE_MB', '200'))  # disk space for cached map tiles
+    WEATHER_BASE_TILE_TTL_DAYS = 7
+    WEATHER_LAYER_TILE_TTL_MINUTES = 5
+    WEATHER_CACHE_MINUTES = 10  # OpenWeather updates current conditions about every 10 minutes
+    WEATHER_GEOCODE_CACHE_DAYS = 30
+    WEATHER_GEOCODE_MISS_CACHE_MINUTES = 60  # unknown city names (typos mostly) are remembered this long
+    WEATHER_MAP_CACHE_MB = int(os.getenv('WEATHER_MAP_CACHE_MB', '64'))  # memory for rendered weather maps
\ No newline at end of file
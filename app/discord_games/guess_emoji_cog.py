@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta
+import asyncio
 import sqlite3
 import time
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from app.utils.command_utils import custom_command
-from app.services.emojis_service import EmojiService
+from app.services.emojis_service import emoji_service
 from app.services.database_service import DatabaseService
 from app.services.gambling_service import level_up_message
 from app.utils.logger import logger
@@ -13,9 +14,29 @@ from app.config import Config
 class GuessEmoji(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.emoji_service = EmojiService()
+        self.emoji_service = emoji_service
         self.database = DatabaseService()
         self.config = Config()
+        self.refill_question_pool.start()
+        self.sweep_active_games.start()
+
+    def cog_unload(self):
+        self.refill_question_pool.cancel()
+        self.sweep_active_games.cancel()
+
+    @tasks.loop(minutes=Config.EMOJI_GAME_SWEEP_MINUTES)
+    async def sweep_active_games(self):
+        try:
+            await asyncio.to_thread(self.emoji_service.active_games.sweep)
+        except Exception as e:
+            logger.error(f"Failed to sweep emoji games: {e}")
+
+    @tasks.loop(minutes=Config.EMOJI_POOL_REFILL_MINUTES)
+    async def refill_question_pool(self):
+        try:
+            await asyncio.to_thread(self.emoji_service.refill_question_pool)
+        except Exception as e:
+            logger.error(f"Failed to refill emoji question pool: {e}")
 
     @custom_command(name='emojis', help="Play the emoji guessing game! Use once to start, use again to answer.")
     async def emojis(self, ctx, *, input: str = None):
@@ -24,7 +45,7 @@ class GuessEmoji(commands.Cog):
         if input is None:
             print("in if from command")
             # Start a new game
-            question_data = self.emoji_service.start_game(user_id)
+            question_data = await asyncio.to_thread(self.emoji_service.start_game, user_id)
             print(f"after start game from command, question_data: {question_data} (type: {type(question_data)})")
             if question_data is None:
                 next_refresh_time = self.calculate_time_remaining()
@@ -47,7 +68,7 @@ class GuessEmoji(commands.Cog):
         else:
             # Answer the current game
             print("in else from command")
-            result = self.emoji_service.answer_game(user_id, input)
+            result = await asyncio.to_thread(self.emoji_service.answer_game, user_id, input)
             print(f"Result from answer_game: {result} (type: {type(result)})")
             if result is None:
                 embed = discord.Embed(title="Emoji Guessing Game",
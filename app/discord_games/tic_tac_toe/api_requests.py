@@ -1,5 +1,6 @@
 # Note: you need to be using OpenAI Python v0.27.0 for the code below to work
 import dis
+import random
 import re
 
 import openai
@@ -15,32 +16,44 @@ class APIResponse:
         self.error = None
 
 
-def get_shiro_response_on_tictactoe(interaction, game, best_move, second_best, third_best):
-    print("gamevariables recived in api request: " + str(game))
-    discord_username = format_discord_username(interaction.user.name)
-    #board_state_str = ''.join(game.board) 
+# used right away when aichan moves, and kept if the LLM comment doesn't arrive in time
+COMMENT_TEMPLATES = {
+    "easy": [
+        "Position {position}, hmm... I'll go easy on you this time~",
+        "I'll just put my {mark} on {position}, your turn!",
+        "Don't worry, I'm only playing with one hand! {position} it is.",
+    ],
+    "medium": [
+        "{position}! Let's see how you handle that~",
+        "Taking {position}. Your move, think carefully!",
+        "Hehe, {position} looks nice for my {mark}.",
+    ],
+    "hard": [
+        "{position}. I don't lose, you know.",
+        "My {mark} goes to {position}. You can still try~",
+        "{position}! Every move is calculated, hehe.",
+    ],
+}
+
+
+def get_template_comment(difficulty, position, mark):
+    templates = COMMENT_TEMPLATES.get(difficulty, COMMENT_TEMPLATES["medium"])
+    return random.choice(templates).format(position=position, mark=mark)
+
+
+def get_shiro_comment_on_move(user_name, user_id, game, position, mark):
+    """Blocking. Asks the LLM for a short comment on the move aichan already made. Returns None if it fails."""
+    discord_username = format_discord_username(user_name)
     shiro_last_response = game.bot_last_response
-    moves_info = ""
-    if best_move is not None:
-        moves_info += f"best possible move: position '{best_move}'."
-    if second_best is not None:
-        moves_info += f"second best move: position '{second_best}'."
-    if third_best is not None:
-        moves_info += f"third best move: position '{third_best}'."
 
     game_information_for_master = f"""
-    This is current board state: {game.board}
-    You are playing as: '{game.player_mark}' and now it is your turn to make a move.
-    Here are moves that were calculated by algorithm :
-    {moves_info}.
-    Difficulty user chose: '{game.difficulty}' This is important for you to know because it will affect your decisions.
+    This is current board state after your move ({game.state.size}x{game.state.size}, {game.state.win_length} in a row wins, '.' is an empty cell, positions 0-{game.state.cells - 1} row by row):
+    {board_string_to_formatted(game.state.to_string(), game.state.size)}
+    You are playing as: '{mark}' and you just played position {position}.
+    Difficulty user chose: '{game.difficulty}'.
     This is your last comment, use it to make follow up comment: {shiro_last_response}.
-    What i want for you is to decide what move you want to make based on the difficulty the user choose.
-    I want you to take a short break, think about it, and then make your decision.
-    Oh, and don't mention about algorithm, it's our secret. Pretend it is your own choice.
-    Please, answer in this format:
-    position: choose one of the moves above
-    comment: comment about your move strategy. Make it playful and engaging. But keep it short.
+    Comment on your move. Make it playful and engaging. But keep it short, one or two sentences.
+    Answer only with the comment.
     """
 
     shiros_decision = [
@@ -48,57 +61,20 @@ def get_shiro_response_on_tictactoe(interaction, game, best_move, second_best, t
         {"role": "system", "content": game_information_for_master}
     ]
 
-
-
-    print("messages: " + str(shiros_decision))
-    what_shiro_chose = send_to_groq(shiros_decision)
-    
-    print(f"aichan made this decision:\n {what_shiro_chose}")
-    # Extract the move position using regex
-    # match = re.search(r'Best possible move: (\d)', what_shiro_chose)
-    # if match:
-    #     move_position = int(match.group(1))
-    # else:
-    #     print("Failed to extract move position from response")
-    #     # we will need to resend it to master
-
-    
-
-    
-
+    what_shiro_said = send_to_groq(shiros_decision, user_id, "tic_tac_toe")
     # Check if the response is a tuple
-    if isinstance(what_shiro_chose, tuple):
+    if isinstance(what_shiro_said, tuple):
         # Extract the first element of the tuple which should be the string response
-        what_shiro_chose = what_shiro_chose[0]
-    
-    if isinstance(what_shiro_chose, str):
-        # Extract position number
-        move_match = re.search(r'position:\s*(\d+)', what_shiro_chose, re.IGNORECASE)
-        shiro_move = int(move_match.group(1)) if move_match else None
-
-        # Extract comment
-        comment_match = re.search(r'comment:\s*"((?:\\.|[^"\\])*)"', what_shiro_chose, re.IGNORECASE | re.DOTALL)
-        if not comment_match:
-            comment_match = re.search(r'comment:\s*(.*)', what_shiro_chose, re.IGNORECASE | re.DOTALL)
-        
-        shiro_comment = comment_match.group(1).strip() if comment_match else None
-
-        print("-------------")
-        print("Bot Comment:", shiro_comment)
-        print("Next Move:", shiro_move)
-        print("-------------")
-        
-        return shiro_comment, shiro_move
-    else:
-        print("Received non-string response from OpenAI.")
-        return None, None
+        what_shiro_said = what_shiro_said[0]
+    if not isinstance(what_shiro_said, str) or not what_shiro_said.strip():
+        print("Received no comment from the LLM.")
+        return None
+    comment = what_shiro_said.strip().strip('"')
+    if comment.lower().startswith("comment:"):
+        comment = comment[len("comment:"):].strip()
+    return comment[:500]
 
           
-    
-
-    
-
-    
 def api_call_thread(api_response, messages, temperature, model):
     try:
         completion = client.chat.completions.create(model=model,
@@ -137,10 +113,10 @@ def format_discord_username(discord_username):
     return sanitized_username
 
 
-def board_string_to_formatted(board_str):
+def board_string_to_formatted(board_str, size=3):
         formatted_board = ''
-        for i in range(0, 9, 3):
-            formatted_board += board_str[i:i+3] + '\n'
+        for i in range(0, size * size, size):
+            formatted_board += board_str[i:i+size] + '\n'
         return formatted_board.strip()
 
 if __name__ == "__main__":
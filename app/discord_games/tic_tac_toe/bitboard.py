@@ -0,0 +1,135 @@
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+EMPTY = '.'
+
+
+class Geometry(NamedTuple):
+    """Precomputed masks for a size x size board where win_length in a row wins."""
+    size: int
+    win_length: int
+    full: int
+    lines: Tuple[int, ...]  # every winning line as a mask
+    lines_through: Tuple[Tuple[int, ...], ...]  # lines_through[cell] = lines containing that cell
+
+
+@lru_cache(maxsize=None)
+def get_geometry(size: int = 3, win_length: int = 3) -> Geometry:
+    lines = []
+    for row in range(size):
+        for col in range(size):
+            for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_row = row + row_step * (win_length - 1)
+                end_col = col + col_step * (win_length - 1)
+                if not (0 <= end_row < size and 0 <= end_col < size):
+                    continue
+                mask = 0
+                for step in range(win_length):
+                    mask |= 1 << ((row + row_step * step) * size + col + col_step * step)
+                lines.append(mask)
+    cells = size * size
+    lines_through = tuple(tuple(line for line in lines if line >> cell & 1) for cell in range(cells))
+    return Geometry(size, win_length, (1 << cells) - 1, tuple(lines), lines_through)
+
+
+CLASSIC = get_geometry(3, 3)
+FULL_BOARD = CLASSIC.full
+WIN_MASKS = CLASSIC.lines
+# _WINNING[mask] is True if the cells in mask contain a full line of the 3x3 board
+_WINNING = tuple(any(mask & win_mask == win_mask for win_mask in WIN_MASKS) for mask in range(1 << 9))
+
+
+def is_win(mask: int) -> bool:
+    return _WINNING[mask]
+
+
+def has_line(mask: int, geometry: Geometry) -> bool:
+    if geometry is CLASSIC:
+        return _WINNING[mask]
+    for line in geometry.lines:
+        if mask & line == line:
+            return True
+    return False
+
+
+def other_mark(mark: str) -> str:
+    return 'O' if mark == 'X' else 'X'
+
+
+class BoardState(NamedTuple):
+    """Immutable board: one bit mask per mark (bit i = cell i, row major) and the mark to move.
+
+    Defaults to the classic 3x3 board, bigger boards set size and win_length.
+    """
+    x_mask: int = 0
+    o_mask: int = 0
+    to_move: str = 'X'
+    size: int = 3
+    win_length: int = 3
+
+    @classmethod
+    def from_string(cls, board_state: str, to_move: str = 'X', size: int = 3, win_length: int = 3) -> "BoardState":
+        """Parses the board_state column ('.' empty, 'X', 'O', size * size characters)."""
+        x_mask = o_mask = 0
+        for i, cell in enumerate(board_state[:size * size]):
+            if cell == 'X':
+                x_mask |= 1 << i
+            elif cell == 'O':
+                o_mask |= 1 << i
+        return cls(x_mask, o_mask, to_move, size, win_length)
+
+    @property
+    def geometry(self) -> Geometry:
+        return get_geometry(self.size, self.win_length)
+
+    @property
+    def cells(self) -> int:
+        return self.size * self.size
+
+    def to_string(self) -> str:
+        return ''.join(self.cell(i) for i in range(self.cells))
+
+    def cell(self, position: int) -> str:
+        if self.x_mask >> position & 1:
+            return 'X'
+        if self.o_mask >> position & 1:
+            return 'O'
+        return EMPTY
+
+    def rows(self) -> List[str]:
+        board = self.to_string()
+        return [board[i:i + self.size] for i in range(0, self.cells, self.size)]
+
+    def mask_of(self, mark: str) -> int:
+        return self.x_mask if mark == 'X' else self.o_mask
+
+    @property
+    def occupied(self) -> int:
+        return self.x_mask | self.o_mask
+
+    def is_empty(self, position: int) -> bool:
+        return 0 <= position < self.cells and not self.occupied >> position & 1
+
+    def empty_positions(self) -> List[int]:
+        return [position for position in range(self.cells) if self.is_empty(position)]
+
+    def move_count(self) -> int:
+        return bin(self.occupied).count("1")
+
+    def play(self, position: int) -> "BoardState":
+        """Returns the board after to_move plays position, with the turn passed to the other mark."""
+        bit = 1 << position
+        if self.to_move == 'X':
+            return self._replace(x_mask=self.x_mask | bit, to_move='O')
+        return self._replace(o_mask=self.o_mask | bit, to_move='X')
+
+    def winner(self) -> Optional[str]:
+        geometry = self.geometry
+        if has_line(self.x_mask, geometry):
+            return 'X'
+        if has_line(self.o_mask, geometry):
+            return 'O'
+        return None
+
+    def is_full(self) -> bool:
+        return self.occupied == self.geometry.full
@@ -24,11 +24,14 @@ def hash_username(username):
 #     game_id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
 #     discord_username VARCHAR(255) NOT NULL,
 #     bot_last_response TEXT, 
-#     board_state CHAR(9) NOT NULL DEFAULT '.........',
+#     board_state CHAR(9) NOT NULL DEFAULT '.........', board_size * board_size characters
 #     game_status ENUM('ongoing', 'win', 'tie') NOT NULL DEFAULT 'ongoing',
 #     difficulty VARCHAR(10) NOT NULL DEFAULT ,
 #     last_move_player VARCHAR(20) NOT NULL DEFAULT , player or aichan
 #     player_mark CHAR(1) NOT NULL DEFAULT ,
+#     board_size INTEGER NOT NULL DEFAULT 3,
+#     win_length INTEGER NOT NULL DEFAULT 3,
+#     user_id INTEGER UNIQUE, updated_at INTEGER, seed INTEGER, message_id INTEGER
 # );
 current_working_directory = os.getcwd()
 # Construct the path relative to the current working directory
@@ -38,92 +41,52 @@ if not os.path.exists(data_directory):
     os.makedirs(data_directory)
 path = os.path.join(data_directory, "database.db")
 
-def get_game_variables(interaction, difficulty, last_move_player=None):
-    discord_username = hash_username(interaction.user.name)
-    try:
-        with sqlite3.connect(path) as conn:
-            cursor = conn.cursor()
-
-            # Query to check if user_id exists in the 'games' table and retrieve its game_status
-            query = """
-                SELECT game_id, bot_last_response, game_status, board_state, difficulty, last_move_player, player_mark 
-                FROM tic_tac_toe_games 
-                WHERE discord_username = ?
-            """
-            cursor.execute(query, (discord_username,))
-            result = cursor.fetchone()
-
-            if result:
-                game_id, bot_last_response, game_status, board_state, difficulty, last_move_player, player_mark = result
-                return {
-                    "game_id": game_id,
-                    "bot_last_response": bot_last_response,
-                    "game_status": game_status,
-                    "board_state": board_state,
-                    "difficulty": difficulty,
-                    "last_move_player": last_move_player,
-                    "player_mark": player_mark
-                }
-            else:
-                # Setting up a new game for the user with a fresh board
-                board_state = '.........'
-                game_status = 'ongoing'
-                player_mark = "X"  # X because X will be first, and we already randomed who goes first in 'last_move_player'
-                bot_last_response = "Let's start the game!"
+_game_columns = ("user_id", "discord_username", "bot_last_response", "game_status", "board_state", "difficulty",
+                 "last_move_player", "player_mark", "move_history", "board_size", "win_length", "updated_at", "seed", "message_id")
 
-                # You might need to adjust the insertion if you're using additional fields in the table
-                query = """
-                    INSERT INTO tic_tac_toe_games (discord_username, board_state, game_status, difficulty, last_move_player, player_mark, bot_last_response) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """
-                cursor.execute(query, (discord_username, board_state, game_status, difficulty, last_move_player, player_mark, bot_last_response))
-                conn.commit()
-                game_id = cursor.lastrowid
 
-                return {
-                    "game_id": game_id,
-                    "game_status": game_status,
-                    "board_state": board_state,
-                    "difficulty": difficulty,
-                    "last_move_player": last_move_player,
-                    "player_mark": player_mark,
-                    "bot_last_response": bot_last_response
-                }
+def delete_stale_games(updated_after):
+    """Drops saved games nobody touched since updated_after."""
+    try:
+        with sqlite3.connect(path) as conn:
+            # games saved before sessions were keyed by user id can't be matched to a user anymore
+            conn.execute("DELETE FROM tic_tac_toe_games WHERE user_id IS NULL OR COALESCE(updated_at, 0) <= ?", (updated_after,))
+            conn.commit()
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
-        return None
 
-def send_new_game_variables(interaction, board_state, bot_last_response, last_move_player, player_mark, move_history):
-    discord_username = hash_username(interaction.user.name)
+def load_game(user_id, updated_after):
+    """Returns the user's saved game as a dict, or None if there is none touched after updated_after."""
     try:
         with sqlite3.connect(path) as conn:
             cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(_game_columns)} FROM tic_tac_toe_games WHERE user_id = ? AND updated_at > ?",
+                           (user_id, updated_after))
+            row = cursor.fetchone()
+        return dict(zip(_game_columns, row)) if row else None
+    except sqlite3.Error as e:
+        print(f"An error occurred: {e}")
+        return None
 
-            query = """
-                UPDATE tic_tac_toe_games 
-                SET board_state = ?, bot_last_response = ?, last_move_player = ?, player_mark = ?, move_history = ?
-                WHERE discord_username = ?
-            """
-            cursor.execute(query, (board_state, bot_last_response, last_move_player, player_mark, move_history, discord_username))
+def save_games(games):
+    """Upserts the given game dicts (with every column in _game_columns), one row per user."""
+    placeholders = ", ".join("?" for _ in _game_columns)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in _game_columns if column != "user_id")
+    try:
+        with sqlite3.connect(path) as conn:
+            conn.executemany(f"""
+                INSERT INTO tic_tac_toe_games ({', '.join(_game_columns)})
+                VALUES ({placeholders})
+                ON CONFLICT(user_id) DO UPDATE SET {updates}
+            """, [tuple(game[column] for column in _game_columns) for game in games])
             conn.commit()
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
 
-def finish_game_aka_delete_user_from_table(interaction, game_id):
-    discord_username = hash_username(interaction.user.name)
+def delete_games(user_ids):
     try:
         with sqlite3.connect(path) as conn:
-            cursor = conn.cursor()
-
-            query = """
-                DELETE FROM tic_tac_toe_games 
-                WHERE discord_username = ? AND game_id = ?
-            """
-            cursor.execute(query, (discord_username, game_id))
+            conn.executemany("DELETE FROM tic_tac_toe_games WHERE user_id = ?", [(user_id,) for user_id in user_ids])
             conn.commit()
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
-    
-
-def add_tokens_to_db():
-    pass
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""Search engine for bigger k-in-a-row boards (4x4, 5x5, ...).
+
+3x3 is solved exactly by the solver module. Bigger boards are too big for that, so this engine runs a negamax
+alpha-beta search with a transposition table and move ordering, deepening one ply at a time until the time
+or node budget runs out and returning the ranking from the deepest finished iteration. A node budget makes the
+result depend only on the position, a time budget makes it depend on how fast the host is.
+"""
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.discord_games.tic_tac_toe.bitboard import BoardState, get_geometry, other_mark
+
+# board size -> how many in a row win, these are the variants offered in /tic_tac_toe
+BOARD_VARIANTS = {3: 3, 4: 4, 5: 4}
+
+WIN_SCORE = 1_000_000
+_MATE_THRESHOLD = WIN_SCORE - 1000  # scores above this are forced wins, not heuristic values
+_INFINITY = WIN_SCORE + 1
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult(NamedTuple):
+    moves: Tuple[Tuple[int, int], ...]  # (position, score) best first
+    depth: int  # deepest fully searched iteration, 0 if none finished
+    nodes: int
+    elapsed: float
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class Engine:
+    """One search per instance: the transposition table is reused across the iterations of that search."""
+
+    def __init__(self, size: int, win_length: int, time_budget: float = 1.0, max_table_size: int = 1_000_000,
+                 max_nodes: Optional[int] = None):
+        self.geometry = get_geometry(size, win_length)
+        self.time_budget = time_budget
+        self.max_nodes = max_nodes if max_nodes is not None else float("inf")
+        self.max_table_size = max_table_size
+        self.table = {}  # (mover, other) -> (depth, score, flag, best move)
+        self.nodes = 0
+        self.deadline = 0.0
+        # a line with n stones of one mark and none of the other is worth 10^n
+        self.line_weights = [0] + [10 ** count for count in range(1, win_length + 1)]
+
+    def _wins_with(self, mask: int, cell: int) -> bool:
+        """True if the stone just put on cell completes a line. Only the lines through cell are checked."""
+        for line in self.geometry.lines_through[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def evaluate(self, mover: int, other: int) -> int:
+        """Heuristic score for the side to move: open lines weighted by how full they are."""
+        score = 0
+        weights = self.line_weights
+        for line in self.geometry.lines:
+            mine = mover & line
+            theirs = other & line
+            if mine and not theirs:
+                score += weights[_popcount(mine)]
+            elif theirs and not mine:
+                score -= weights[_popcount(theirs)]
+        return score
+
+    def ordered_moves(self, mover: int, other: int, first: Optional[int] = None) -> List[int]:
+        """Empty cells, most promising first: the transposition table move, then cells on busy open lines."""
+        occupied = mover | other
+        scored = []
+        for cell in range(self.geometry.size * self.geometry.size):
+            if occupied >> cell & 1:
+                continue
+            if cell == first:
+                priority = 1 << 40
+            else:
+                priority = 0
+                for line in self.geometry.lines_through[cell]:
+                    mine = _popcount(mover & line)
+                    theirs = _popcount(other & line)
+                    if not theirs:
+                        priority += 1 + mine * mine * 4
+                    if not mine:
+                        priority += theirs * theirs * 3
+            scored.append((priority, cell))
+        scored.sort(reverse=True)
+        return [cell for _, cell in scored]
+
+    def _store(self, key, depth: int, score: int, flag: int, best_move: Optional[int], ply: int):
+        if len(self.table) >= self.max_table_size:
+            self.table.clear()
+        # forced win scores are stored relative to this node so they stay valid at any ply
+        if score > _MATE_THRESHOLD:
+            score += ply
+        elif score < -_MATE_THRESHOLD:
+            score -= ply
+        self.table[key] = (depth, score, flag, best_move)
+
+    def _negamax(self, mover: int, other: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        # every 256 nodes (a few ms at ~30k nodes/s), so the search stops close to its budget
+        if not self.nodes & 255 and (self.nodes >= self.max_nodes or time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+        key = (mover, other)
+        original_alpha = alpha
+        tt_move = None
+        entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, entry_score, flag, tt_move = entry
+            if entry_score > _MATE_THRESHOLD:
+                entry_score -= ply
+            elif entry_score < -_MATE_THRESHOLD:
+                entry_score += ply
+            if entry_depth >= depth:
+                if flag == _EXACT:
+                    return entry_score
+                if flag == _LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        if depth == 0:
+            return self.evaluate(mover, other)
+
+        full = self.geometry.full
+        best_score = -_INFINITY
+        best_move = None
+        for cell in self.ordered_moves(mover, other, tt_move):
+            new_mover = mover | 1 << cell
+            if self._wins_with(new_mover, cell):
+                score = WIN_SCORE - ply
+            elif new_mover | other == full:
+                score = 0
+            else:
+                score = -self._negamax(other, new_mover, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = _UPPER
+        elif best_score >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self._store(key, depth, best_score, flag, best_move, ply)
+        return best_score
+
+    def _search_root(self, mover: int, other: int, order: List[int], depth: int, count: int) -> List[Tuple[int, int]]:
+        """Scores every root move. Only the best count scores are exact, the rest are upper bounds."""
+        full = self.geometry.full
+        ranked = []
+        for cell in order:
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+            new_mover = mover | 1 << cell
+            if self._wins_with(new_mover, cell):
+                score = WIN_SCORE
+            elif new_mover | other == full:
+                score = 0
+            else:
+                # a move only needs an exact score if it can still make the top count
+                alpha = ranked[count - 1][1] if len(ranked) >= count else -_INFINITY
+                score = -self._negamax(other, new_mover, depth - 1, -_INFINITY, -alpha, 1)
+            ranked.append((cell, score))
+            ranked.sort(key=lambda move: move[1], reverse=True)
+        return ranked
+
+    def search(self, state: BoardState, count: int = 3) -> SearchResult:
+        """Ranks the moves for the side to move, deepening until the time or node budget is used up."""
+        started = time.perf_counter()
+        self.deadline = started + self.time_budget
+        self.nodes = 0
+        mover, other = state.mask_of(state.to_move), state.mask_of(other_mark(state.to_move))
+        order = self.ordered_moves(mover, other)
+        ranked = [(cell, 0) for cell in order]
+        reached = 0
+
+        for depth in range(1, len(order) + 1):
+            try:
+                ranked = self._search_root(mover, other, order, depth, count)
+            except SearchTimeout:
+                break
+            reached = depth
+            order = [cell for cell, _ in ranked]
+            if abs(ranked[0][1]) > _MATE_THRESHOLD:
+                break  # the result is already forced
+
+        return SearchResult(tuple(ranked), reached, self.nodes, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    # Self-play benchmark: python -m app.discord_games.tic_tac_toe.engine [seconds per move]
+    import sys
+
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    for size, win_length in BOARD_VARIANTS.items():
+        if size == 3:
+            continue
+        state = BoardState(size=size, win_length=win_length)
+        total_nodes = 0
+        total_time = 0.0
+        print(f"{size}x{size}, {win_length} in a row, {budget}s per move")
+        while state.winner() is None and not state.is_full():
+            result = Engine(size, win_length, budget).search(state)
+            position, score = result.moves[0]
+            total_nodes += result.nodes
+            total_time += result.elapsed
+            print(f"  {state.to_move} plays {position:2d}  score {score:8d}  depth {result.depth:2d}  "
+                  f"{result.nodes:8d} nodes  {result.elapsed:.2f}s  {result.nodes / max(result.elapsed, 1e-9):,.0f} nodes/s")
+            state = state.play(position)
+        for row in state.rows():
+            print(f"  {row}")
+        print(f"  result: {state.winner() or 'tie'}, {total_nodes:,} nodes in {total_time:.2f}s, "
+              f"{total_nodes / max(total_time, 1e-9):,.0f} nodes/s")
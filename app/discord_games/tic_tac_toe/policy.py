@@ -0,0 +1,41 @@
+import math
+import random
+from typing import Sequence, Tuple
+
+# softmax temperature per difficulty over utilities in [-1, 1], 0 = always the best move
+DIFFICULTY_TEMPERATURES = {
+    "easy": 0.4,
+    "medium": 0.08,
+    "hard": 0.0,
+}
+
+
+def solver_utility(score: int) -> float:
+    """Solver scores are 10 - plies for a win, so this maps them to [-1, 1]."""
+    return score / 10
+
+
+def engine_utility(score: int) -> float:
+    """Engine scores are heuristic (10^n per open line) or +-1,000,000 for forced results, squashed to [-1, 1]."""
+    return math.tanh(score / 1000)
+
+
+def samples_moves(difficulty: str) -> bool:
+    """False if the difficulty always plays the best move, then the other moves' utilities are never looked at."""
+    return DIFFICULTY_TEMPERATURES.get(difficulty, DIFFICULTY_TEMPERATURES["medium"]) > 0
+
+
+def choose_move(moves: Sequence[Tuple[int, float]], difficulty: str, rng: random.Random) -> int:
+    """Picks a move from (position, utility) pairs, best first, with a softmax at the difficulty's temperature.
+
+    The utilities must be exact, bounds would skew the odds (see TicTacToe.scored_moves).
+
+    With the same rng seed and the same utilities the choice is always the same. The utilities of bigger boards
+    come from a node limited search, they only differ if a slow host hits the time budget first.
+    """
+    temperature = DIFFICULTY_TEMPERATURES.get(difficulty, DIFFICULTY_TEMPERATURES["medium"])
+    if temperature <= 0 or len(moves) == 1:
+        return moves[0][0]
+    best = max(utility for _, utility in moves)
+    weights = [math.exp((utility - best) / temperature) for _, utility in moves]
+    return rng.choices([position for position, _ in moves], weights=weights)[0]
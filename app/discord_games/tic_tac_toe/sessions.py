@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+from app.discord_games.tic_tac_toe.database_queries import load_game, save_games, delete_games, delete_stale_games
+from app.utils.logger import logger
+
+if TYPE_CHECKING:
+    from app.discord_games.tic_tac_toe.tic_tac_toe import TicTacToe  # imports this module, so only for type checkers
+
+
+class TicTacToeSessions:
+    """Tic-tac-toe games in memory, keyed by user id. Memory is the source of truth.
+
+    SQLite is only a write-behind copy for crash recovery: changed games are saved by flush(), which the
+    tic-tac-toe cog runs every few seconds. After a restart a game is loaded back the first time its player
+    touches it, game_factory turns the saved row into a game. Games nobody touched for ttl_seconds are
+    dropped by sweep().
+    """
+
+    def __init__(self, ttl_seconds: int, game_factory):
+        self.ttl_seconds = ttl_seconds
+        self.game_factory = game_factory
+        self.games: Dict[int, "TicTacToe"] = {}
+        self._finished = set()  # user ids whose saved game should be deleted on the next flush
+        self._lock = threading.Lock()  # bot moves run in worker threads
+
+    async def get(self, user_id: int) -> Optional["TicTacToe"]:
+        game = self.games.get(user_id)
+        if game is None and user_id not in self._finished:
+            # a miss is every new game and every click on an old board, the SQLite read stays off the event loop
+            game = await asyncio.to_thread(self._load, user_id)
+        if game is not None:
+            game.last_active = time.time()
+        return game
+
+    def _load(self, user_id: int) -> Optional["TicTacToe"]:
+        """Blocking. Restores a game saved before a restart. Only reached when the game isn't in memory."""
+        row = load_game(user_id, time.time() - self.ttl_seconds)
+        if row is None:
+            return None
+        game = self.game_factory(row)
+        game.user_id = user_id
+        game.last_active = row["updated_at"]
+        with self._lock:
+            game = self.games.setdefault(user_id, game)
+        logger.info(f"Restored tic-tac-toe game of user {user_id}")
+        return game
+
+    def add(self, user_id: int, game: "TicTacToe"):
+        with self._lock:
+            self._finished.discard(user_id)
+            game.user_id = user_id
+            game.last_active = time.time()
+            game.dirty = True
+            self.games[user_id] = game
+
+    def finish(self, user_id: int):
+        """Forgets a finished (or abandoned) game, its saved row is deleted on the next flush."""
+        with self._lock:
+            if self.games.pop(user_id, None) is not None:
+                self._finished.add(user_id)
+
+    @staticmethod
+    def _to_row(game: "TicTacToe") -> dict:
+        return {
+            "user_id": game.user_id,
+            "discord_username": game.discord_username,
+            "bot_last_response": game.bot_last_response,
+            "game_status": game.game_status or "ongoing",
+            "board_state": game.state.to_string(),
+            "difficulty": game.difficulty,
+            "last_move_player": game.last_move_player,
+            "player_mark": game.player_mark,
+            "move_history": game.move_history,
+            "board_size": game.state.size,
+            "win_length": game.state.win_length,
+            "updated_at": int(game.last_active),
+            "seed": game.seed,
+            "message_id": game.message_id,
+        }
+
+    def flush(self) -> int:
+        """Blocking. Writes changed games and deletes finished ones. Returns how many rows were written."""
+        with self._lock:
+            changed = [game for game in self.games.values() if game.dirty]
+            for game in changed:
+                game.dirty = False
+            rows = [self._to_row(game) for game in changed]
+            finished, self._finished = self._finished, set()
+        if rows:
+            save_games(rows)
+        if finished:
+            delete_games(finished)
+        return len(rows)
+
+    def sweep(self) -> int:
+        """Drops games idle for longer than the ttl. Returns how many were dropped."""
+        cutoff = time.time() - self.ttl_seconds
+        abandoned = [user_id for user_id, game in list(self.games.items()) if game.last_active < cutoff]
+        for user_id in abandoned:
+            self.finish(user_id)
+        if abandoned:
+            logger.info(f"Dropped {len(abandoned)} abandoned tic-tac-toe games")
+        return len(abandoned)
+
+    def delete_stale(self):
+        """Blocking. Deletes saved games that expired while the bot was offline."""
+        delete_stale_games(time.time() - self.ttl_seconds)
@@ -11,15 +11,23 @@ from sympy import im, use
 
 
 from decimal import Decimal
-from app.discord_games.tic_tac_toe.database_queries import get_game_variables, send_new_game_variables,finish_game_aka_delete_user_from_table
-from app.discord_games.tic_tac_toe.api_requests import get_shiro_response_on_tictactoe
-
-games = {}
+from app.discord_games.tic_tac_toe.api_requests import get_shiro_comment_on_move, get_template_comment
+from app.discord_games.tic_tac_toe import solver, engine, policy
+from app.services.token_ledger_service import token_ledger
+from app.config import Config
+import asyncio
+from app.discord_games.tic_tac_toe.bitboard import BoardState, EMPTY, is_win
+from functools import lru_cache
+from app.discord_games.tic_tac_toe.sessions import TicTacToeSessions
+from app.discord_games.tic_tac_toe.database_queries import hash_username
+
+sessions = TicTacToeSessions(Config.TIC_TAC_TOE_SESSION_TTL_HOURS * 3600, lambda row: game_from_row(row))
+comment_tasks = set()
+solver.solve_all()  # a few milliseconds, fills the solver table once at startup
 
 class TicTacToe:
     def __init__(self):
-        self.board = [['.'] * 3 for _ in range(3)]
-        self.player_mark = ''
+        self.state = BoardState()
         self.last_move_player = ''
         self.interaction = None
         self.game_id = None
@@ -27,71 +35,67 @@ class TicTacToe:
         self.bot_last_response = None
         self.move_history = ""
         self.who_won = None
-
-    def board_to_string(self):
-        return ''.join(cell for row in self.board for cell in row)
-
-    def string_to_board(self, board_str):
-        return [list(board_str[i:i+3]) for i in range(0, len(board_str), 3)]
+        self.difficulty = "medium"
+        self.seed = 0  # seeds aichan's move choices, see choose_bot_move
+        self.message_id = None  # the board message, clicks on other messages are ignored
+        # session bookkeeping, see sessions.py
+        self.user_id = None
+        self.discord_username = ""  # hashed, like in the database
+        self.last_active = 0.0
+        self.dirty = False  # changed since the last save to SQLite
+
+    @property
+    def player_mark(self):
+        """Mark of the side to move, kept in the board state."""
+        return self.state.to_move
 
     def make_move(self, position, bot_last_response=None):
         print(f"position: {position}")
-        print(f"board: {self.board}")
-        row, col = divmod(position, 3)
-        print(f"row: {row}, col: {col}")
-        if self.board[row][col] == '.':  # . then no one has played there
-            self.board[row][col] = self.player_mark  # we set the current player to that position (X or O)
+        print(f"board: {self.state.to_string()}")
+        if self.state.is_empty(position):  # no one has played there
+            mover = self.state.to_move
+            self.state = self.state.play(position)  # the turn passes to the other mark
 
-            board_state_str = self.board_to_string()
+            board_state_str = self.state.to_string()
             print(f"Board State String: {board_state_str}")  # This is the string to be used for database storage
 
             # Update move history
-            move_number = sum(row.count('X') for row in self.board) + sum(row.count('O') for row in self.board)
+            move_number = self.state.move_count()
             self.move_history += f"{move_number}:{position},"  # append the move to the move history
             print(f"move history: {self.move_history}")
-            print (f"board before checking game status: {self.board}")
-
 
-            if self.check_win(self.player_mark):  # Check for win
+            winner = self.state.winner()
+            if winner == mover:  # Check for win
                 self.who_won = f"The  {self.last_move_player }has won!"
                 print(f"The  {self.last_move_player }has won!")
                 self.set_game_status(f"finished")
                 return None
             # Here, check if the opposing player has won
-            opposing_mark = 'O' if self.player_mark == 'X' else 'X'
-
-            if self.check_win(opposing_mark):
+            if winner is not None:
                 self.who_won = f"The player {self.last_move_player }has lost!"
                 print(f"The player {self.last_move_player }has lost!")  # or any other actions you'd like to take
                 self.set_game_status(f"finished")
                 return None
-            
-            if all(cell != '.' for row in self.board for cell in row):
+
+            if self.state.is_full():
                 print("Tie detected!")
                 self.set_game_status("tie")  # Check if all cells are filled to determine tie
                 return None
 
-            self.player_mark = 'O' if self.player_mark == 'X' else 'X'
             self.set_last_move_player("player") if self.last_move_player == "aichan" else self.set_last_move_player("aichan")
-
-            send_new_game_variables(self.interaction, board_state_str, bot_last_response, self.last_move_player, self.player_mark, self.move_history)
+            self.dirty = True  # saved to the database by the next session flush
             return None
 
-
     def check_win(self, mark):
-        win_conditions = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6),
-                        (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
-        for condition in win_conditions:
-            if self.board[condition[0] // 3][condition[0] % 3] == \
-            self.board[condition[1] // 3][condition[1] % 3] == \
-            self.board[condition[2] // 3][condition[2] % 3] == mark:
-                return True
-        return False
-
+        return is_win(self.state.mask_of(mark))
 
     def set_board_from_state(self, board_state: str):
         """Sets the game board based on the given board state."""
-        self.board = self.string_to_board(board_state)
+        self.state = BoardState.from_string(board_state, self.state.to_move, self.state.size, self.state.win_length)
+
+    def set_board_variant(self, board_size: int, win_length: int):
+        """Sets the board size and how many in a row win, call it before set_board_from_state."""
+        self.state = BoardState(to_move=self.state.to_move, size=board_size, win_length=win_length)
 
     def set_game_id(self, game_id: int):
         """Sets the game board based on the given board state."""
@@ -107,7 +111,7 @@ class TicTacToe:
 
     def set_player_mark(self, player_mark):
         """Sets the player mark so we know if it is X or O."""
-        self.player_mark = player_mark
+        self.state = self.state._replace(to_move=player_mark)
 
     def set_last_move_player(self, last_move_player: str):
         """Sets the last move player so we know if the made was made by player or aichan."""
@@ -123,9 +127,9 @@ class TicTacToe:
     def reset(self):
         self.__init__()
 
-    def minimax(self, board, depth, is_maximizing, player_mark, opponent_mark):
+    def minimax(self, state, depth, is_maximizing, player_mark):
         
-        score = self.evaluate(board, player_mark, opponent_mark)
+        score = self.evaluate(state, player_mark)
 
         if score == 10:
             return score - depth
@@ -133,57 +137,47 @@ class TicTacToe:
         if score == -10:
             return score + depth
 
-        if not any('.' in sublist for sublist in board):
+        if state.is_full():
             return 0
 
         if is_maximizing:
             best = -1000
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '.':
-                        board[i][j] = player_mark    
-                        best = max(best, self.minimax(board, depth+1, not is_maximizing, player_mark, opponent_mark))
-                        board[i][j] = '.'
+            for position in state.empty_positions():
+                best = max(best, self.minimax(state.play(position), depth+1, not is_maximizing, player_mark))
             return best
         else:
             best = 1000
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == '.':
-                        board[i][j] = opponent_mark
-                        best = min(best, self.minimax(board, depth+1, not is_maximizing, player_mark, opponent_mark))
-                        board[i][j] = '.'
+            for position in state.empty_positions():
+                best = min(best, self.minimax(state.play(position), depth+1, not is_maximizing, player_mark))
             return best
 
-    def flat_to_2d(self, index):
-        row = index // 3
-        col = index % 3
-        return row, col
-
-    def evaluate(self, board, player_mark, opponent_mark):
-        # Updated to use the 2D board directly.
-        win_conditions = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
-        for condition in win_conditions:
-            if board[condition[0] // 3][condition[0] % 3] == board[condition[1] // 3][condition[1] % 3] == \
-                    board[condition[2] // 3][condition[2] % 3]:
-                if board[condition[0] // 3][condition[0] % 3] == player_mark:
-                    return 10
-                elif board[condition[0] // 3][condition[0] % 3] == opponent_mark:
-                    return -10
-        return 0
-
-
-    def find_best_moves(self, board, player_mark):
-        print(f"board in find_best_move : {board}")
+    def evaluate(self, state, player_mark):
+        winner = state.winner()
+        if winner is None:
+            return 0
+        return 10 if winner == player_mark else -10
+
+    def scored_moves(self, state, exact_count=None):
+        """Moves for the side to move as (position, utility in [-1, 1]), best first.
+
+        On bigger boards only the first exact_count utilities are exact (all of them by default), the engine
+        only bounds the others. The solver always scores every 3x3 move exactly. The engine searches a fixed
+        number of nodes, so the utilities only depend on the board unless the time budget cuts it short.
+        """
+        if state.size == 3 and state.win_length == 3:
+            return [(position, policy.solver_utility(score)) for position, score in solver.scored_moves(state)]
+        count = state.cells if exact_count is None else exact_count
+        search = engine.Engine(state.size, state.win_length, Config.TIC_TAC_TOE_MOVE_BUDGET, max_nodes=Config.TIC_TAC_TOE_MOVE_NODES)
+        result = search.search(state, count)
+        return [(position, policy.engine_utility(score)) for position, score in result.moves]
+
+    def find_best_moves_by_search(self, state):
+        """Top 3 moves by exhaustive minimax, kept as the reference solver.best_moves is checked against."""
         moves_scores = []
 
-        for i in range(9):  # Looping through all positions
-            row, col = divmod(i, 3)
-            if board[row][col] == '.':
-                board[row][col] = player_mark
-                move_val = self.minimax(board, 0, False, player_mark, 'X' if player_mark == 'O' else 'O')
-                moves_scores.append((i, move_val))
-                board[row][col] = '.'
+        for i in state.empty_positions():  # Looping through all free positions
+            move_val = self.minimax(state.play(i), 0, False, state.to_move)
+            moves_scores.append((i, move_val))
 
         # Sort the moves based on their scores
         moves_scores.sort(key=lambda x: x[1], reverse=True)  # Highest scores first
@@ -192,19 +186,50 @@ class TicTacToe:
         return [move_score[0] for move_score in moves_scores[:3]]
 
 
+def cell_custom_id(board_size, position):
+    return f"tictactoe:{board_size}:{position}"
+
+
+class BoardDispatcher(discord.ui.View):
+    """Persistent view registered once per board size with bot.add_view.
+
+    Its buttons are never shown, they only receive clicks: discord.py routes a click on any board with the same
+    custom_id here, including boards sent before a restart, and button_callback finds the game by user id.
+    """
+
+    def __init__(self, board_size):
+        super().__init__(timeout=None)
+        for position in range(board_size * board_size):
+            button = discord.ui.Button(label=EMPTY, row=position // board_size, custom_id=cell_custom_id(board_size, position))
+            button.callback = button_callback
+            self.add_item(button)
+
+
 class ButtonGrid(discord.ui.View):
+    """What a board looks like. Only rendered, clicks are handled by BoardDispatcher."""
 
-    def __init__(self, board, lock_buttons=False, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        assert len(board) == 3 and all(len(row) == 3 for row in board), "Expected a 3x3 board!"
+    def __init__(self, state, lock_buttons=False, *args, **kwargs):
+        super().__init__(*args, timeout=None, **kwargs)
         self.lock_buttons = lock_buttons
 
-        for i in range(3):
-            for j in range(3):
-                label = board[i][j] if board[i][j] != ' ' else str(i * 3 + j + 1)  # Convert 2D position to flat index for the label
-                button = TicTacToeButton(style=discord.ButtonStyle.secondary, label=label, row=i, custom_id=f"button_{i * 3 + j}", disabled=self.lock_buttons)
-                button.callback = button_callback  # Don't forget to define your button_callback function
-                self.add_item(button)
+        for position in range(state.cells):
+            row = position // state.size
+            label = state.cell(position)
+            button = TicTacToeButton(style=discord.ButtonStyle.secondary, label=label, row=row, custom_id=cell_custom_id(state.size, position), disabled=self.lock_buttons)
+            self.add_item(button)
+        # a stopped view isn't stored by discord.py when it is sent, so the same object can be reused for many messages
+        self.stop()
+
+
+@lru_cache(maxsize=2048)
+def _render_board(board, board_size, win_length, lock_buttons):
+    return ButtonGrid(BoardState.from_string(board, size=board_size, win_length=win_length), lock_buttons)
+
+
+def render_board(state, lock_buttons=False):
+    """Cached ButtonGrid for the board, boards that look the same share one view."""
+    return _render_board(state.to_string(), state.size, state.win_length, lock_buttons)
+
 
 class TicTacToeButton(discord.ui.Button):
     def __init__(self, *args, **kwargs):
@@ -226,88 +251,52 @@ async def finish_game(interaction, embed, view):
     await interaction.response.edit_message(embed=embed, view=view)
 
 
+def is_game_over(game):
+    return game.game_status in ("finished", "tie")
+
+
 async def button_callback(interaction: discord.Interaction):
     user_id = interaction.user.id
-    if user_id not in games:
-        games[user_id] = TicTacToe()
-
-    # Set a local reference to the user's game instance
-    game = games[user_id]
-    difficulty = game.difficulty
-    # Retrieve the current game status from the database
-    game_variables = get_game_variables(interaction, difficulty)
-    print(f"game status {game_variables}")
-    
-    # Set the game board based on the retrieved board state
-    set_game_state(game, game_variables) # after this  the board is in 2D
-    
-    position = int(interaction.data["custom_id"].split('_')[-1])
-    
-    result = game.make_move(position)
-    game_status = game.game_status
-    if game_status == "finished":
-        
-        # we need to send to database that game is finished
-        finish_game_aka_delete_user_from_table(interaction, game.game_id)
-        embed = create_embed(game, game_variables)
-        view = ButtonGrid(game.board)
-        await interaction.response.edit_message(embed=embed, view=view)
-        await interaction.followup.send(str(game.who_won))
-        delete_game_from_dictionary(interaction)
-        return 
-    elif game_status == "tie":
-        # we need to send to database that game is finished
-        finish_game_aka_delete_user_from_table(interaction, game.game_id)
-        embed = create_embed(game, game_variables)
-        view = ButtonGrid(game.board)
-        await interaction.response.edit_message(embed=embed, view=view)
-        await interaction.followup.send("It's a tie!")
-        delete_game_from_dictionary(interaction)
+    game = await sessions.get(user_id)
+    if game is None:
+        await interaction.response.send_message("This game has ended or expired, start a new one with `/tic_tac_toe`.", ephemeral=True)
+        return
+    if game.message_id is not None and interaction.message is not None and interaction.message.id != game.message_id:
+        await interaction.response.send_message("That's not your current board, start your own game with `/tic_tac_toe`.", ephemeral=True)
+        return
+    if game.last_move_player != "player":
+        await interaction.response.send_message("Wait for your turn!", ephemeral=True)
         return
+    game.set_interaction(interaction)
     
-    embed = create_embed(game, game_variables)
-    view = ButtonGrid(game.board, lock_buttons=True) if game.last_move_player == "aichan" else ButtonGrid(game.board)
+    position = int(interaction.data["custom_id"].rsplit(':', 1)[-1])
+    game.make_move(position)
+
+    # aichan answers in the same edit, TIC_TAC_TOE_MOVE_BUDGET is capped so this stays inside the interaction deadline
+    bot_move = None
+    if not is_game_over(game) and game.last_move_player == "aichan":
+        bot_move = await make_bot_move(game)
+
+    embed = create_embed(game)
+    view = render_board(game.state, lock_buttons=is_game_over(game))
     await interaction.response.edit_message(embed=embed, view=view)
+    await send_game_result(interaction, game)
+    if bot_move is not None and Config.TIC_TAC_TOE_LLM_COMMENTS:
+        schedule_bot_comment(interaction, game, *bot_move)
 
-    if result:
-        await interaction.followup.send(result)
-        game.reset()
-    
-    # After updating for the player's move
-    if game.last_move_player == "aichan": # if player is last, then aichan should move now
-        shiro_move(interaction, difficulty, game)
 
-        # Update the game state and visuals again for the bot's move
-        embed = create_embed(game, game_variables)
-        view = ButtonGrid(game.board, lock_buttons=False)
-        
-        game_status = game.game_status
-        if game_status == "finished":
-            # we need to send to database that game is finished
-            finish_game_aka_delete_user_from_table(interaction, game.game_id)
-            embed = create_embed(game, game_variables)
-            view = ButtonGrid(game.board)
-            await interaction.followup.send(embed=embed, view=view)
-            await interaction.followup.send(str(game.who_won))
-            delete_game_from_dictionary(interaction)
-            return
-             
-        elif game_status == "tie":
-            # we need to send to database that game is finished
-            finish_game_aka_delete_user_from_table(interaction, game.game_id)
-            embed = create_embed(game, game_variables)
-            view = ButtonGrid(game.board)
-            await interaction.followup.send(embed=embed, view=view)
-            await interaction.followup.send("It's a tie!")
-            delete_game_from_dictionary(interaction)
-            return
-        await interaction.followup.send(embed=embed, view=view)
-        # Delete the game instance from the dictionary for both finished and tie condition
+async def send_game_result(interaction, game):
+    """Ends the session and announces the result if the game is over."""
+    if game.game_status == "finished":
+        sessions.finish(interaction.user.id)  # the saved copy is deleted on the next flush
+        await interaction.followup.send(str(game.who_won))
+    elif game.game_status == "tie":
+        sessions.finish(interaction.user.id)
+        await interaction.followup.send("It's a tie!")
 
 
 def create_embed(game, game_variables=None):
 
-    # Assuming game.board is a 2D list
     board_desc = f"""Game status is: {game.game_status}\n
     Aichan: {game.bot_last_response}\n
     Your turn, {game.last_move_player}! Your mark: {game.player_mark}
@@ -319,120 +308,116 @@ def create_embed(game, game_variables=None):
 
 def set_game_state(game, game_variables):
     """Sets the game state based on the given game variables."""
+    game.set_board_variant(game_variables.get("board_size", 3), game_variables.get("win_length", 3))
     game.set_board_from_state(game_variables["board_state"])
         # we need to take the last move player from db to determine if it i
     game.set_last_move_player(game_variables["last_move_player"])
     game.set_player_mark(game_variables["player_mark"])
-    game.set_game_id(game_variables["game_id"])
+    game.set_game_id(game_variables.get("game_id"))
     game.set_game_status(game_variables["game_status"])
-    #game.set_bot_last_response(game_variables["bot_last_response"])
+    game.set_bot_last_response(game_variables.get("bot_last_response"))
     game.set_difficulty(game_variables["difficulty"])
 
 
-def get_moves_from_algorithm(game, player_mark):
-    """Returns the best moves for the given board and player mark."""
-    # Create a 2D board and get the best move for aichan using the Minimax function
-    best_moves_from_master = game.find_best_moves(game.board, player_mark)
-
-    best_move = None
-    second_best = None
-    third_best = None
-
-    if len(best_moves_from_master) >= 1:
-        best_move = best_moves_from_master[0]
-    if len(best_moves_from_master) >= 2:
-        second_best = best_moves_from_master[1]
-    if len(best_moves_from_master) == 3:
-        third_best = best_moves_from_master[2]
-
-    return best_move, second_best, third_best
-
-
-def shiro_move(interaction, difficulty, game):
-    user_id = interaction.user.id
-    if user_id not in games:
-        games[user_id] = TicTacToe()
-    # Set a local reference to the user's game instance
-    game = games[user_id]
-
-    game_variables = get_game_variables(interaction, difficulty) # retrive game status from database
-        # Create a 2D board and get the best move for aichan using the Minimax function
-    best_move, second_best, third_best = get_moves_from_algorithm(game, 'O')
-# The _ ignores the row, you only get the column    # Convert 2D position to flat position
-    print(best_move, second_best, third_best)
-    print(f"bot move position: {third_best}")
-    set_game_state(game, game_variables)
-        # You'll need to implement this
-    which_move = random.randint(0, 2)
-
-    # HERE WE SEND IT TO CHATGPT TO GET ANSWER
-    shiro_comment, shiro_move = get_shiro_response_on_tictactoe(interaction, game, best_move, second_best, third_best)
-    game.set_bot_last_response(shiro_comment)
-    #################################################################
-    if best_move == shiro_move or second_best == shiro_move or third_best == shiro_move:
-        game.make_move(shiro_move, shiro_comment)
-
-    else:
-        # Handle the case where the chosen move is None.
-        # If something in aichan answer went wrong, just choose best move.
-        game.make_move(best_move, "Hmm, I think I will go for the best move!")
-        print("Defaulted to best move, something went wrong with aichan answer")
-
-def delete_game_from_dictionary(interaction):
-    user_id = interaction.user.id
-    if user_id in games:
-        del games[user_id]
-        print("Deleted game instance from dictionary")
-
-
-
-async def start_tic_tac_toc(interaction, difficulty):
+def game_from_row(row):
+    """Rebuilds a game from its saved database row, used to restore sessions after a restart."""
+    game = TicTacToe()
+    set_game_state(game, row)
+    game.move_history = row.get("move_history") or ""
+    game.discord_username = row.get("discord_username") or ""
+    game.seed = row.get("seed") or 0
+    game.message_id = row.get("message_id")
+    return game
+
+
+def choose_bot_move(game):
+    """Blocking on bigger boards (engine search). Picks aichan's move with the difficulty policy."""
+    # aichan plays whichever mark is to move, so this works when she starts with X too
+    # the softmax compares every utility, so they all have to be exact unless only the best move is played
+    moves = game.scored_moves(game.state, None if policy.samples_moves(game.difficulty) else 1)
+    # seeded by the game and the board, so the same game plays out the same way (see scored_moves)
+    rng = random.Random(f"{game.seed}:{game.state.to_string()}")
+    return policy.choose_move(moves, game.difficulty, rng)
+
+
+async def make_bot_move(game):
+    """Plays aichan's move right away with a template comment. Returns (position, mark, board after the move)."""
+    position = await asyncio.to_thread(choose_bot_move, game)
+    mark = game.player_mark
+    comment = get_template_comment(game.difficulty, position, mark)
+    game.set_bot_last_response(comment)
+    game.make_move(position, comment)
+    return position, mark, game.state
+
+
+def schedule_bot_comment(interaction, game, position, mark, state):
+    """Fetches aichan's LLM comment in the background and patches it into the board message."""
+    task = asyncio.create_task(patch_bot_comment(interaction, game, position, mark, state))
+    comment_tasks.add(task)  # keep a reference until it is done, the loop only holds weak ones
+    task.add_done_callback(comment_tasks.discard)
+
+
+async def patch_bot_comment(interaction, game, position, mark, state):
+    allowed, _, _ = await asyncio.to_thread(token_ledger.check_quota, interaction.user.id, 500)
+    if not allowed:
+        return  # out of tokens for today, the template comment stays
+    try:
+        comment = await asyncio.wait_for(
+            asyncio.to_thread(get_shiro_comment_on_move, interaction.user.name, interaction.user.id, game, position, mark),
+            timeout=Config.TIC_TAC_TOE_COMMENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("aichan comment timed out, keeping the template comment")
+        return
+    except Exception as e:
+        print(f"Failed to get aichan comment: {e}")
+        return
+    if not comment or game.state is not state:
+        return  # no comment, or the player already moved on and the message shows a newer board
+    game.set_bot_last_response(comment)
+    game.dirty = True
+    try:
+        await interaction.edit_original_response(embed=create_embed(game))
+    except discord.HTTPException as e:
+        print(f"Failed to patch aichan comment: {e}")
+
+async def start_tic_tac_toc(interaction, difficulty, board_size=3):
     user_id = interaction.user.id
-    if user_id not in games:
-        games[user_id] = TicTacToe()
-
-    # Set a local reference to the user's game instance
-    game = games[user_id]
+    # an unfinished game is continued as it is, difficulty and board size only apply to new games
+    game = await sessions.get(user_id)
+    if game is None:
+        if difficulty not in ["easy", "medium", "hard"]:  # need to change it to droplist
+            # set default difficulty to medium
+            difficulty = "medium"
+        if board_size not in engine.BOARD_VARIANTS:
+            board_size = 3
+
+        #1. we need to first determine who starts first
+        who_starts_first = random.randint(0, 1)
+        last_move_player = "player" if who_starts_first == 0 else "aichan"
+
+        game = TicTacToe()
+        game.set_board_variant(board_size, engine.BOARD_VARIANTS[board_size])
+        game.set_player_mark("X")  # X because X will be first, and we already randomed who goes first in 'last_move_player'
+        game.set_last_move_player(last_move_player)
+        game.set_difficulty(difficulty)
+        game.set_game_status("ongoing")
+        game.set_bot_last_response("Let's start the game!")
+        game.seed = random.getrandbits(32)
+        game.discord_username = hash_username(interaction.user.name)
+        sessions.add(user_id, game)
     game.set_interaction(interaction)
-    
-        #1. we need to first determine who starts first if this is new game, then we will send to DB and check
-    who_starts_first = random.randint(0, 1)
-    
+    print(f"Board: {game.state.to_string()}")
 
-    last_move_player="player" if who_starts_first == 0 else "aichan"
-    # FOR TESTING PURPOSES
-    #last_move_player = "player"
-        # 2. Retrieve the game status from the database
-    game_variables = get_game_variables(interaction, difficulty, last_move_player)
-#####################################################################################
-# I NEED TO CHECK WHO IS GOONA MOVE FIRST AND IF aichan, THEN SEND TO API FOR aichan MOVE AND TRIGGER MOVE FUNCTION 
-    print(f"game varuables: {game_variables}")
-    if game_variables is None:
-        # Handle the error, e.g., by sending a message or logging it
-        await interaction.response.send_message("An error occurred while retrieving the game data.")
-        return
+    # 3. If aichan goes first she moves before the board is sent
+    bot_move = None
+    if game.last_move_player == "aichan":
+        bot_move = await make_bot_move(game)
 
-    # 2. Set the game board based on the retrieved game state and difficulty
-    if difficulty not in ["easy", "medium", "hard"]:  # need to change it to droplist
-        # set default difficulty to medium
-        difficulty = "medium"
-    set_game_state(game, game_variables)
- 
-    print(f"Board: {game.board}")
-    if not isinstance(game.board, list) or len(game.board) != 9:
-        print("Board is not in the expected format!")
-    required_keys = ["game_status", "difficulty", "last_move_player", "player_mark"]
-    if not all(key in game_variables for key in required_keys):
-        print("Some keys are missing from game_variables!")
-
-    # 3. Create and send the embed
-    embed = create_embed(game,game_variables)
-    view = ButtonGrid(game.board, lock_buttons=True) if game.last_move_player == "aichan" else ButtonGrid(game.board)
+    embed = create_embed(game)
+    view = render_board(game.state, lock_buttons=is_game_over(game))
     await interaction.response.send_message(embed=embed, view=view)
-    if game.last_move_player == "aichan": # if player is last, then aichan should move now
-
-        shiro_move(interaction, difficulty, game) # aichan makes her move
-        # Update the game state and visuals again for the bot's move
-        embed = create_embed(game, game_variables)
-        view = ButtonGrid(game.board, lock_buttons=False)
-        await interaction.followup.send(embed=embed, view=view)
+    game.message_id = (await interaction.original_response()).id
+    game.dirty = True
+    await send_game_result(interaction, game)
+    if bot_move is not None and Config.TIC_TAC_TOE_LLM_COMMENTS:
+        schedule_bot_comment(interaction, game, *bot_move)
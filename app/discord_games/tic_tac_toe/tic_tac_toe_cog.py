@@ -0,0 +1,44 @@
+import asyncio
+from discord.ext import commands, tasks
+from app.discord_games.tic_tac_toe.tic_tac_toe import sessions, BoardDispatcher
+from app.discord_games.tic_tac_toe.engine import BOARD_VARIANTS
+from app.utils.logger import logger
+from app.config import Config
+
+
+class TicTacToeCog(commands.Cog):
+    """Owns the tic-tac-toe boards' persistent views and keeps the in-memory sessions backed up."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        # one persistent view per board size answers clicks on every board, also on messages sent before a restart
+        for board_size in BOARD_VARIANTS:
+            self.bot.add_view(BoardDispatcher(board_size))
+        await asyncio.to_thread(sessions.delete_stale)
+        self.flush_sessions.start()
+        self.sweep_sessions.start()
+
+    async def cog_unload(self):
+        self.flush_sessions.cancel()
+        self.sweep_sessions.cancel()
+        await asyncio.to_thread(sessions.flush)
+
+    @tasks.loop(seconds=Config.TIC_TAC_TOE_FLUSH_SECONDS)
+    async def flush_sessions(self):
+        try:
+            await asyncio.to_thread(sessions.flush)
+        except Exception as e:
+            logger.error(f"Failed to save tic-tac-toe sessions: {e}")
+
+    @tasks.loop(minutes=10)
+    async def sweep_sessions(self):
+        try:
+            sessions.sweep()
+        except Exception as e:
+            logger.error(f"Failed to sweep tic-tac-toe sessions: {e}")
+
+
+async def setup(bot):
+    await bot.add_cog(TicTacToeCog(bot))
@@ -57,6 +57,22 @@ class DatabaseService:
                 move_history TEXT NOT NULL DEFAULT 'New game begins'
             )
         """)
+            # Check if board size and session columns exist, if not add them (older games are all 3x3)
+            cursor.execute("PRAGMA table_info(tic_tac_toe_games)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if 'board_size' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN board_size INTEGER NOT NULL DEFAULT 3")
+            if 'win_length' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN win_length INTEGER NOT NULL DEFAULT 3")
+            if 'user_id' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN user_id INTEGER")
+            if 'updated_at' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN updated_at INTEGER")
+            if 'seed' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN seed INTEGER DEFAULT 0")
+            if 'message_id' not in columns:
+                cursor.execute("ALTER TABLE tic_tac_toe_games ADD COLUMN message_id INTEGER")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tic_tac_toe_games_user_id ON tic_tac_toe_games (user_id)")
             
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS alarms (
@@ -67,6 +83,22 @@ class DatabaseService:
                 note TEXT,
                 FOREIGN KEY(user_id) REFERENCES users(id)
             )""")
+            # the alarm scheduler only loads alarms due soon, by trigger_time range
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_trigger_time ON alarms (trigger_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_user_id ON alarms (user_id)")
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tea_timers (
+                user_id INTEGER PRIMARY KEY,
+                channel_id INTEGER,
+                end_time REAL
+            )""")
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tea_defaults (
+                user_id INTEGER PRIMARY KEY,
+                seconds INTEGER
+            )""")
 
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS emoji_game_usage (
@@ -268,10 +300,76 @@ class DatabaseService:
             cursor.execute("DELETE FROM alarms WHERE id = ?", (alarm_id,))
             conn.commit()
 
-    def get_alarms(self):
+    def delete_alarms(self, alarm_ids):
+        alarm_ids = list(alarm_ids)
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(alarm_ids), 500):  # stays under SQLite's limit of bound parameters
+                chunk = alarm_ids[start:start + 500]
+                cursor.execute(f"DELETE FROM alarms WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            conn.commit()
+
+    def get_alarm(self, alarm_id):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id, channel_id, trigger_time, note FROM alarms WHERE id = ?", (alarm_id,))
+            return cursor.fetchone()
+
+    def get_alarms_due(self, until):
+        """Alarms with trigger_time <= until, oldest first."""
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT id, user_id, channel_id, trigger_time, note FROM alarms
+            WHERE trigger_time <= ? ORDER BY trigger_time""", (until,))
+            return cursor.fetchall()
+
+    def get_alarm_times_between(self, after, until):
+        """(id, trigger_time) of the alarms with after < trigger_time <= until."""
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, trigger_time FROM alarms WHERE trigger_time > ? AND trigger_time <= ?", (after, until))
+            return cursor.fetchall()
+
+    def set_tea_timer(self, user_id, channel_id, end_time):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO tea_timers (user_id, channel_id, end_time) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET channel_id = excluded.channel_id, end_time = excluded.end_time""",
+                           (user_id, channel_id, end_time))
+            conn.commit()
+
+    def get_tea_timer(self, user_id):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT channel_id, end_time FROM tea_timers WHERE user_id = ?", (user_id,))
+            return cursor.fetchone()
+
+    def get_tea_timers(self):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id, end_time FROM tea_timers")
+            return cursor.fetchall()
+
+    def delete_tea_timer(self, user_id):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM tea_timers WHERE user_id = ?", (user_id,))
+            conn.commit()
+
+    def set_tea_default(self, user_id, seconds):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO tea_defaults (user_id, seconds) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET seconds = excluded.seconds""", (user_id, seconds))
+            conn.commit()
+
+    def get_tea_defaults(self):
         with sqlite3.connect(self.path) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id, user_id, channel_id, trigger_time, note FROM alarms")
+            cursor.execute("SELECT user_id, seconds FROM tea_defaults")
             return cursor.fetchall()
 
     def get_user_alarms(self, user_id):
@@ -0,0 +1,102 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Iterable, Tuple
+
+CORRECT = "correct"
+WRONG = "wrong"
+AMBIGUOUS = "ambiguous"
+
+_stop_words = {"the", "a", "an", "of", "and", "&"}
+_roman_numerals = {"ii", "iii", "iv", "vi", "vii", "viii", "ix"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, no accents, no punctuation, no articles."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(word for word in text.split() if word not in _stop_words)
+
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def token_set_ratio(a: str, b: str) -> float:
+    """Similarity (0-1) that ignores word order and extra words on one side, like fuzzywuzzy's token_set_ratio."""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    common = " ".join(sorted(tokens_a & tokens_b))
+    rest_a = " ".join(sorted(tokens_a - tokens_b))
+    rest_b = " ".join(sorted(tokens_b - tokens_a))
+    combined_a = f"{common} {rest_a}".strip()
+    combined_b = f"{common} {rest_b}".strip()
+    return max(
+        SequenceMatcher(None, common, combined_a).ratio() if common else 0.0,
+        SequenceMatcher(None, common, combined_b).ratio() if common else 0.0,
+        SequenceMatcher(None, combined_a, combined_b).ratio(),
+    )
+
+
+def token_sort_ratio(a: str, b: str) -> float:
+    """Similarity (0-1) of both strings with their words sorted, so word order doesn't matter."""
+    return SequenceMatcher(None, " ".join(sorted(a.split())), " ".join(sorted(b.split()))).ratio()
+
+
+def number_tokens(text: str) -> set:
+    """Digits and roman numerals of a normalized text, "toy story 3" and "toy story" are different movies."""
+    return {word for word in text.split() if word.isdigit() or word in _roman_numerals}
+
+
+def within_typos(guess: str, target: str) -> bool:
+    """One typo per six letters, none below six letters where one edit is usually another word (bars/cars)."""
+    if len(target) < 6:
+        return False
+    return levenshtein(guess, target) <= len(target) // 6
+
+
+def match_answer(user_answer: str, correct_answer: str, aliases: Iterable[str] = ()) -> Tuple[str, float]:
+    """Decides locally if an answer is clearly right, clearly wrong or needs the LLM to judge.
+
+    Only exact answers, the same words in another order and small typos in longer answers are CORRECT, and only
+    when their numbers match exactly. Anything borderline is AMBIGUOUS so the LLM decides.
+    Returns (CORRECT | WRONG | AMBIGUOUS, best similarity score).
+    """
+    guess = normalize(user_answer)
+    if not guess:
+        return WRONG, 0.0
+
+    best_score = 0.0
+    shares_words = False
+    for candidate in [correct_answer, *aliases]:
+        target = normalize(candidate)
+        if not target:
+            continue
+        if guess == target:
+            return CORRECT, 1.0
+
+        best_score = max(best_score, token_set_ratio(guess, target))
+        shares_words = shares_words or bool(set(guess.split()) & set(target.split()))
+        if number_tokens(guess) != number_tokens(target):
+            continue  # sequels and years are never typos
+
+        sorted_guess, sorted_target = " ".join(sorted(guess.split())), " ".join(sorted(target.split()))
+        if sorted_guess == sorted_target:
+            return CORRECT, 1.0
+        if within_typos(guess, target) or within_typos(sorted_guess, sorted_target):
+            return CORRECT, token_sort_ratio(guess, target)
+
+    # partial answers ("lion" for "the lion king") and near misses go to the LLM
+    if best_score < 0.35 and not shares_words:
+        return WRONG, best_score
+    return AMBIGUOUS, best_score
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.services.http_client import http_client, request_once
+from app.utils.logger import logger
+
+
+class EmojiCatalog:
+    """emoji-api.com catalog cached on disk and kept in memory as prefiltered tuples.
+
+    The full list is downloaded at most once per ttl (and revalidated with ETag when it is stale).
+    If the api is down we keep serving the last snapshot from disk, and don't ask again for retry_seconds.
+    """
+
+    def __init__(self, api_key: str, ttl_seconds: int = 7 * 24 * 3600, cache_directory: str = None, retry_seconds: int = 300):
+        self.api_key = api_key
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        if cache_directory is None:
+            cache_directory = os.path.join(os.getcwd(), "app", "persistent_data", "emoji_cache")
+        os.makedirs(cache_directory, exist_ok=True)
+        self.cache_path = os.path.join(cache_directory, "emojis.json")
+
+        self.characters: Tuple[str, ...] = ()
+        self.by_group: Dict[str, Tuple[str, ...]] = {}
+        self.etag: Optional[str] = None
+        self.fetched_at = 0.0
+        self.failed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"https://emoji-api.com/emojis?access_key={self.api_key}"
+
+    def is_fresh(self) -> bool:
+        return bool(self.characters) and time.time() - self.fetched_at < self.ttl_seconds
+
+    def _failed_recently(self) -> bool:
+        return time.time() - self.failed_at < self.retry_seconds
+
+    def _index(self, emojis):
+        """Keeps only printable single emojis and groups them by category."""
+        groups = {}
+        for emoji in emojis:
+            character = emoji.get("character")
+            if not character or not character.isprintable():
+                continue
+            groups.setdefault(emoji.get("group", "other"), []).append(character)
+        self.by_group = {group: tuple(characters) for group, characters in groups.items()}
+        self.characters = tuple(character for characters in self.by_group.values() for character in characters)
+
+    def _load_from_disk(self) -> bool:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        self._index(snapshot.get("emojis", []))
+        self.etag = snapshot.get("etag")
+        self.fetched_at = snapshot.get("fetched_at", 0)
+        return bool(self.characters)
+
+    def _save_to_disk(self, emojis):
+        snapshot = {"etag": self.etag, "fetched_at": self.fetched_at, "emojis": emojis}
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(temp_path, self.cache_path)
+
+    def _touch_disk(self):
+        """Updates fetched_at in the snapshot after a 304 without rewriting the emoji list."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._save_to_disk(snapshot.get("emojis", []))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to update emoji catalog snapshot: {e}")
+
+    def _revalidate(self) -> bool:
+        """Returns False if the api couldn't be reached or answered with an error."""
+        headers = {"If-None-Match": self.etag} if self.etag and self.characters else {}
+        try:
+            if http_client.is_started:
+                # ensure_loaded runs in worker threads, the request itself runs on the bot's shared HTTP client.
+                # No retries, a caller is waiting and the stale snapshot is good enough.
+                response = http_client.request_from_thread("GET", self.url, headers=headers, retries=0)
+            else:
+                # standalone scripts such as emoji_api.py have no bot loop
+                response = asyncio.run(request_once("GET", self.url, headers=headers, retries=0))
+        except Exception as e:
+            logger.error(f"Failed to fetch emoji catalog, using cached snapshot: {e!r}")
+            return False
+
+        if response.status == 304:
+            self.fetched_at = time.time()
+            self._touch_disk()
+            logger.info("Emoji catalog not modified, snapshot revalidated")
+        elif response.status == 200:
+            emojis = [{"character": emoji.get("character"), "group": emoji.get("group", "other")}
+                      for emoji in response.json() if "character" in emoji]
+            self.etag = response.headers.get("ETag")
+            self.fetched_at = time.time()
+            self._index(emojis)
+            self._save_to_disk(emojis)
+            logger.info(f"Emoji catalog downloaded: {len(self.characters)} emojis in {len(self.by_group)} groups")
+        else:
+            logger.error(f"Failed to fetch emoji catalog, status code {response.status}, using cached snapshot")
+            return False
+        return True
+
+    def ensure_loaded(self):
+        """Blocking. Loads the catalog from memory, disk or the api, whichever is the first fresh one."""
+        if self.is_fresh() or (self.characters and self._failed_recently()):
+            return
+        with self._lock:
+            if not self.characters:
+                self._load_from_disk()
+            if self.is_fresh() or self._failed_recently():
+                return
+            if not self._revalidate():
+                self.failed_at = time.time()
+
+    def sample(self, count: int, group: str = None) -> str:
+        """Returns count random distinct emojis joined together, optionally from a single group."""
+        self.ensure_loaded()
+        pool = self.by_group.get(group, ()) if group else self.characters
+        if len(pool) < count:
+            return ''
+        return ''.join(random.sample(pool, count))
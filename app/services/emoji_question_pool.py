@@ -0,0 +1,161 @@
+import json
+import re
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Optional
+from app.services.database_service import DatabaseService
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+def normalize_answer(answer: str) -> str:
+    """Lowercase answer without punctuation and leading articles, used for deduplication."""
+    answer = re.sub(r"[^\w\s]", " ", answer.lower())
+    words = [word for word in answer.split() if word not in ("the", "a", "an")]
+    return " ".join(words)
+
+
+class EmojiQuestionPool:
+    """Pre-generated emoji questions stored in SQLite, so starting a game doesn't wait for GPT."""
+
+    def __init__(self, low_water_mark: int = 10, target_size: int = 25, max_serves: int = 5, active_days: int = 7):
+        self.database_service = DatabaseService()
+        self.low_water_mark = low_water_mark
+        self.target_size = target_size
+        self.max_serves = max_serves  # a question is retired after being served this many times
+        self.active_days = active_days  # players who took a question this recently count for refills
+        self._initialize_pool_tables()
+
+    def _initialize_pool_tables(self):
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS emoji_question_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL UNIQUE,
+                answer TEXT NOT NULL,
+                normalized_answer TEXT NOT NULL UNIQUE,
+                hint TEXT,
+                aliases TEXT DEFAULT '[]',
+                times_served INTEGER DEFAULT 0,
+                created_at INTEGER
+            )""")
+            # Check if column aliases exists, if not add it
+            cursor.execute("PRAGMA table_info(emoji_question_pool)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if 'aliases' not in columns:
+                cursor.execute("ALTER TABLE emoji_question_pool ADD COLUMN aliases TEXT DEFAULT '[]'")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS emoji_question_seen (
+                user_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL,
+                seen_at INTEGER,
+                PRIMARY KEY (user_id, question_id)
+            )""")
+            conn.commit()
+
+    @staticmethod
+    def is_valid_question(question_data: Dict[str, Any]) -> bool:
+        """Rejects questions that are obviously broken: no emojis, empty or essay-long answers."""
+        question = question_data.get("question", "").strip()
+        answer = question_data.get("answer", "").strip()
+        if not question or not answer or len(answer) > 100:
+            return False
+        # the question should be mostly emojis, not letters
+        letters = sum(char.isalnum() and char.isascii() for char in question)
+        return letters <= len(question) // 2
+
+    def add_question(self, question_data: Dict[str, Any]) -> Optional[int]:
+        """Adds a question to the pool. Returns its id, or None if it is invalid or a duplicate."""
+        if not self.is_valid_question(question_data):
+            logger.warning(f"Rejected invalid emoji question: {question_data}")
+            metrics.increment("emoji_pool.rejected_invalid")
+            return None
+
+        aliases = [alias.strip() for alias in question_data.get("aliases") or [] if isinstance(alias, str) and alias.strip()]
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT OR IGNORE INTO emoji_question_pool (question, answer, normalized_answer, hint, aliases, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)""", (question_data["question"].strip(), question_data["answer"].strip(),
+                                           normalize_answer(question_data["answer"]), question_data.get("hint"),
+                                           json.dumps(aliases, ensure_ascii=False), int(time.time())))
+            conn.commit()
+            if cursor.rowcount == 0:
+                metrics.increment("emoji_pool.rejected_duplicate")
+                return None
+            return cursor.lastrowid
+
+    def unseen_floor(self) -> int:
+        """Available questions left for the active player who has seen the most of them.
+
+        A full pool is no use to a regular who has seen all of it, so refills go by this instead of the pool size.
+        """
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM emoji_question_pool WHERE times_served < ?", (self.max_serves,))
+            available = cursor.fetchone()[0]
+            cursor.execute("""
+            SELECT MAX(seen) FROM (
+                SELECT COUNT(*) AS seen FROM emoji_question_seen s
+                JOIN emoji_question_pool p ON p.id = s.question_id
+                WHERE p.times_served < ?
+                GROUP BY s.user_id
+                HAVING MAX(s.seen_at) >= ?
+            )""", (self.max_serves, int(time.time()) - self.active_days * 24 * 3600))
+            most_seen = cursor.fetchone()[0] or 0
+        return available - most_seen
+
+    def mark_seen(self, user_id: int, question_id: int):
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO emoji_question_seen (user_id, question_id, seen_at) VALUES (?, ?, ?)",
+                           (user_id, question_id, int(time.time())))
+            cursor.execute("UPDATE emoji_question_pool SET times_served = times_served + 1 WHERE id = ?", (question_id,))
+            conn.commit()
+
+    def take_question(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Takes a random pooled question the user has never seen and marks it as seen."""
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT id, question, answer, hint, aliases FROM emoji_question_pool
+            WHERE times_served < ?
+            AND id NOT IN (SELECT question_id FROM emoji_question_seen WHERE user_id = ?)
+            ORDER BY RANDOM() LIMIT 1""", (self.max_serves, user_id))
+            row = cursor.fetchone()
+
+        if row is None:
+            metrics.increment("emoji_pool.misses")
+            return None
+
+        question_id, question, answer, hint, aliases = row
+        self.mark_seen(user_id, question_id)
+        metrics.increment("emoji_pool.hits")
+        return {"id": question_id, "question": question, "answer": answer, "hint": hint or "No hint available",
+                "aliases": json.loads(aliases or "[]")}
+
+    def refill(self, generate_question: Callable[[], Optional[Dict[str, Any]]]) -> int:
+        """Tops the pool up so every active player has target_size unseen questions again, once one of them is
+        below the low water mark. Returns how many questions were added."""
+        available = self.unseen_floor()
+        metrics.set_gauge("emoji_pool.available", available)
+        if available >= self.low_water_mark:
+            return 0
+
+        added = 0
+        attempts = 0
+        max_attempts = (self.target_size - available) * 2
+        while available + added < self.target_size and attempts < max_attempts:
+            attempts += 1
+            try:
+                question_data = generate_question()
+            except Exception as e:
+                logger.error(f"Failed to generate emoji question for the pool: {e}")
+                break
+            if question_data and self.add_question(question_data) is not None:
+                added += 1
+
+        metrics.set_gauge("emoji_pool.available", available + added)
+        logger.info(f"Emoji question pool refilled with {added} questions ({available + added} unseen for every active player)")
+        return added
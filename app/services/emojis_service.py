@@ -1,31 +1,36 @@
-import json
 import random
-import re
 import sqlite3
 from typing import Dict, Any, Optional, Tuple
 import time
 from datetime import datetime, timedelta, timezone
 
-import requests
 from app.services.database_service import DatabaseService
+from app.services.emoji_question_pool import EmojiQuestionPool
+from app.services.emoji_catalog import EmojiCatalog
+from app.services.game_state_store import GameStateStore
+from app.services.emoji_answer_matcher import match_answer, CORRECT, WRONG
+from app.utils.metrics import metrics
 from app.config import Config
 from app.utils.logger import logger
 from app.utils.ai_related.groq_api import send_to_groq
 from app.utils.ai_related.chatgpt_api import send_to_openai
+from app.utils.ai_related.structured_output import parse_structured_output, EMOJI_QUESTION_SCHEMA, ANSWER_VALIDATION_SCHEMA
 
 class EmojiService:
     def __init__(self):
         self.database = DatabaseService()
         self.config = Config
-        self.active_games: Dict[int, Dict[str, Any]] = {}
+        self.active_games = GameStateStore("emoji", self.config.EMOJI_GAME_TTL_MINUTES * 60,
+                                           self.config.EMOJI_GAME_MAX_ACTIVE, persist=self.config.EMOJI_GAME_SNAPSHOT)
         self.cooldown_hours = self.config.COOLDOWN_HOURS  # Use the global cooldown_minutes
         self.max_stacked_usages = 4
         self.initial_usages = 2  # Initial usages for new users
         self.emoji_key = self.config.EMOJI_API_KEY
+        self.emoji_catalog = EmojiCatalog(self.emoji_key)
+        self.question_pool = EmojiQuestionPool(self.config.EMOJI_POOL_LOW_WATER_MARK, self.config.EMOJI_POOL_TARGET_SIZE)
 
     def generate_emoji_question(self) -> Optional[Dict[str, Any]]:
-        emojis = self.fetch_emojis()
-        emoji_combination = self.create_emoji_combination(emojis)
+        emoji_combination = self.create_emoji_combination()
         if not emoji_combination:
             logger.error("Failed to generate emoji combination")
             return None
@@ -39,23 +44,18 @@ class EmojiService:
             {{
                 "question": "emoji string here",
                 "answer": "correct answer here",
-                "hint": "hint here"
+                "hint": "hint here",
+                "aliases": ["other accepted names, short forms or spellings of the answer"]
             }}
             Ensure that your response contains a valid JSON object."""}
         ]
-        response, _, _, _ = send_to_openai(messages)
+        response, _, _, _ = send_to_openai(messages, command="emojis")
         logger.info(f"OpenAI API response for question generation: {response}")
         
-        json_str = self.extract_json_from_response(response)
-        if json_str is None:
-            logger.error("Failed to extract JSON from OpenAI API response")
-            return None
-
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from OpenAI API response: {e}")
-            return None
+        question_data = parse_structured_output(response, EMOJI_QUESTION_SCHEMA, "emoji_question")
+        if question_data is None:
+            logger.error("Failed to parse question from OpenAI API response")
+        return question_data
 
     def validate_answer(self, question: str, correct_answer: str, user_answer: str) -> Optional[Dict[str, Any]]:
         messages = [
@@ -71,81 +71,30 @@ class EmojiService:
             }}
             Ensure that your response contains a valid JSON object."""}
         ]
-        response, _, _, _ = send_to_groq(messages)
+        response, _, _, _ = send_to_groq(messages, command="emojis")
         logger.info(f"Groq API response for answer validation: {response}")
         
-        json_str = self.extract_json_from_response(response)
-        if json_str is None:
-            logger.error("Failed to extract JSON from Groq API response")
-            return None
-
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from Groq API response: {e}")
+        validation_data = parse_structured_output(response, ANSWER_VALIDATION_SCHEMA, "emoji_validation")
+        if validation_data is None:
+            logger.error("Failed to parse validation from Groq API response")
             return None
+        validation_data.setdefault("comment", "")
+        return validation_data
 
-    def extract_json_from_response(self, response: str) -> Optional[str]:
-        match = re.search(r'\{[^}]*\}', response)
-        return match.group(0) if match else None
-
-    def update_all_usages(self):
-        with sqlite3.connect(self.database.path) as conn:
-            cursor = conn.cursor()
-            logger.debug("Fetching users for usage update.")
-            cursor.execute("SELECT user_id, available_usages FROM emoji_game_usage")
-            rows = cursor.fetchall()
-
-            logger.debug(f"Found {len(rows)} users to update.")
-            for row in rows:
-                user_id, available_usages = row
-                logger.debug(f"Updating usages for user {user_id}.")
-                new_usages = min(self.max_stacked_usages, available_usages + 1)
-                cursor.execute("""
-                    UPDATE emoji_game_usage
-                    SET available_usages = ?
-                    WHERE user_id = ?
-                """, (new_usages, user_id))
-                logger.debug(f"Updated usages for user {user_id} to {new_usages}.")
-
-            conn.commit()
-            logger.debug("All users' usages updated.")
-
-
-    def update_user_usage(self, user_id: int):
-        """Update a single user's usage count, adding new users with initial usages if necessary."""
-        with sqlite3.connect(self.database.path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT available_usages FROM emoji_game_usage
-                WHERE user_id = ?
-            """, (user_id,))
-            result = cursor.fetchone()
-
-            if result:
-                new_usages = min(self.max_stacked_usages, result[0] - 1)
-                cursor.execute("""
-                    UPDATE emoji_game_usage
-                    SET available_usages = ?
-                    WHERE user_id = ?
-                """, (new_usages, user_id))
-            else:
-                # Assuming first time user if no record found.
-                cursor.execute("""
-                    INSERT INTO emoji_game_usage (user_id, available_usages)
-                    VALUES (?, ?)
-                """, (user_id, self.initial_usages))
-
-            conn.commit()
+    def _refresh_period(self, timestamp: int) -> int:
+        """Index of the global refresh period (every cooldown_hours from REFERENCE_HOUR, local time) a timestamp falls in."""
+        reference = datetime(2000, 1, 1, self.config.REFERENCE_HOUR).timestamp()
+        return int((timestamp - reference) // (self.cooldown_hours * 3600))
 
     def calculate_global_usages(self, last_updated: Optional[int], available_usages: int, current_time: int) -> int:
+        """Usages after refilling one per global refresh that happened since last_updated."""
         if last_updated is None:
             # If last_updated is None, assume it's the first update and give initial usages
-            last_updated = current_time - (self.cooldown_hours * 3600)
-        time_passed = current_time - last_updated
-        periods_passed = time_passed // (self.cooldown_hours * 3600)
-        new_usages = min(self.max_stacked_usages, available_usages + periods_passed)
-        return new_usages
+            return max(available_usages, self.initial_usages)
+        periods_passed = max(0, self._refresh_period(current_time) - self._refresh_period(last_updated))
+        if available_usages >= self.max_stacked_usages:
+            return available_usages
+        return min(self.max_stacked_usages, available_usages + periods_passed)
 
     def get_next_global_refresh_time(self) -> datetime:
         current_time = datetime.now(timezone.utc)
@@ -154,51 +103,46 @@ class EmojiService:
         next_refresh_time = last_refresh_time + timedelta(hours=self.cooldown_hours)
         return next_refresh_time
 
+    def _read_usage(self, cursor, user_id: int, current_time: int) -> Tuple[int, bool]:
+        """Returns (usages refilled up to now, whether the user has a row). Nothing is written."""
+        cursor.execute("""
+            SELECT available_usages, last_updated FROM emoji_game_usage
+            WHERE user_id = ?
+        """, (user_id,))
+        result = cursor.fetchone()
+        if result is None:
+            return self.initial_usages, False
+        available_usages, last_updated = result
+        return self.calculate_global_usages(last_updated, available_usages or 0, current_time), True
 
-    def get_user_usage(self, user_id: int) -> Optional[int]:
-        """Fetch the user's available usages from the database."""
+    def can_play(self, user_id: int) -> bool:
+        """Check if the user can play, refilling their usages lazily and spending one if they can."""
+        current_time = int(time.time())
         with sqlite3.connect(self.database.path) as conn:
             cursor = conn.cursor()
+            # start_game runs in concurrent workers, the write lock is taken before reading so two quick
+            # games can't both read the same count and spend a single usage
+            cursor.execute("BEGIN IMMEDIATE")
+            usages, _ = self._read_usage(cursor, user_id, current_time)
+            if usages <= 0:
+                conn.rollback()
+                return False
             cursor.execute("""
-                SELECT available_usages FROM emoji_game_usage
-                WHERE user_id = ?
-            """, (user_id,))
-            result = cursor.fetchone()
-        print(f"get_user_usage for user_id {user_id}: {result} (type: {type(result)})")
-        return result[0] if result else None
-
-
-    
-
-    def can_play(self, user_id: int) -> bool:
-        """Check if the user can play, updating their usages if they can."""
-        usage = self.get_user_usage(user_id)
-        print(f"can_play usage for user_id {user_id}: {usage} (type: {type(usage)})")
-        if usage is None:
-            # First time user or no existing usage info
-            self.update_user_usage(user_id)
-            return True
-
-        available_usages = usage
-        if available_usages > 0:
-            self.update_user_usage(user_id)
-            return True
-        return False
-
-
+                INSERT INTO emoji_game_usage (user_id, available_usages, last_updated)
+                VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    available_usages = excluded.available_usages,
+                    last_updated = excluded.last_updated
+            """, (user_id, usages - 1, current_time))
+            conn.commit()
+        return True
 
     def get_remaining_usages(self, user_id: int) -> Tuple[int, bool]:
-        """Fetch the user's available usages and whether they are in the database."""
+        """Fetch the user's available usages and whether they are missing from the database."""
         with sqlite3.connect(self.database.path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT available_usages FROM emoji_game_usage
-                WHERE user_id = ?
-            """, (user_id,))
-            result = cursor.fetchone()
-        print(f"get_remaining_usages for user_id {user_id}: {result} (type: {type(result)})")
-        if result:
-            return result[0], False  # Return the usage count and a flag indicating the user is in the database
+            usages, in_db = self._read_usage(conn.cursor(), user_id, int(time.time()))
+        if in_db:
+            return usages, False  # Return the usage count and a flag indicating the user is in the database
         else:
             return 0, True  # Return 0 usages and a flag indicating the user is not in the database
 
@@ -208,52 +152,78 @@ class EmojiService:
         if not self.can_play(user_id):
             return None
 
-        question_data = self.generate_emoji_question()
+        # Serve from the pre-generated pool, only generate live if the user has seen everything in it
+        question_data = self.question_pool.take_question(user_id)
+        if question_data is None:
+            logger.info("Emoji question pool empty for this user, generating question live")
+            question_data = self.generate_emoji_question()
+            if isinstance(question_data, dict) and "question" in question_data and "answer" in question_data:
+                question_id = self.question_pool.add_question(question_data)
+                if question_id is not None:
+                    self.question_pool.mark_seen(user_id, question_id)
+                    question_data["id"] = question_id
         print(f"Generated question data: {question_data} (type: {type(question_data)})")
         if question_data is None:
             return None
 
         # Add checks to ensure question_data is a dictionary with the expected keys
         if isinstance(question_data, dict) and "question" in question_data and "answer" in question_data:
-            self.active_games[user_id] = {
+            self.active_games.set(user_id, {
                 "question": question_data["question"],
                 "answer": question_data["answer"],
-            }
+                "aliases": question_data.get("aliases", []),
+                "question_id": question_data.get("id"),
+            })
             print("after start game")
             return question_data
         else:
             print("Error: question_data is not in the expected format:", question_data)
             return None
 
-
+    def refill_question_pool(self) -> int:
+        """Blocking, run it in a thread. Generates questions until the pool is back at its target size."""
+        return self.question_pool.refill(self.generate_emoji_question)
 
     def answer_game(self, user_id: int, user_answer: str):
-        if user_id not in self.active_games:
+        game_data = self.active_games.pop(user_id)
+        if game_data is None:
             return None
 
-        game_data = self.active_games[user_id]
-        validation_data = self.validate_answer(
-            game_data['question'],
-            game_data['answer'],
-            user_answer
-        )
-
-        del self.active_games[user_id]
+        validation_data = self.match_answer_locally(game_data, user_answer)
+        if validation_data is None:
+            metrics.increment("emoji_validation.llm")
+            try:
+                validation_data = self.validate_answer(
+                    game_data['question'],
+                    game_data['answer'],
+                    user_answer
+                )
+            except Exception:
+                # the game was popped so it can't be answered twice, give it back so a failed LLM call costs nothing
+                self.active_games.set(user_id, game_data)
+                raise
+        metrics.set_gauge("emoji_validation.local_rate", metrics.ratio("emoji_validation.local", "emoji_validation.total"))
         return validation_data
 
-    def fetch_emojis(self):
-        url = f"https://emoji-api.com/emojis?access_key={self.emoji_key}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return []
-
-    def create_emoji_combination(self, emojis, min_emojis=2, max_emojis=5):
-        valid_emojis = [emoji for emoji in emojis if 'character' in emoji and emoji['character'].isprintable()]
+    def match_answer_locally(self, game_data: Dict[str, Any], user_answer: str) -> Optional[Dict[str, Any]]:
+        """Accepts exact answers and obvious typos, rejects clearly wrong ones. Returns None when the LLM should decide."""
+        metrics.increment("emoji_validation.total")
+        decision, score = match_answer(user_answer, game_data['answer'], game_data.get('aliases', []))
+        logger.info(f"Local answer match for '{user_answer}' vs '{game_data['answer']}': {decision} ({score:.2f})")
+        if decision == CORRECT:
+            metrics.increment("emoji_validation.local")
+            metrics.increment("emoji_validation.local_correct")
+            return {"correct": True, "comment": f"Yup, it's **{game_data['answer']}**! Too easy for you huh <:pandayay:1195713738674806784>"}
+        if decision == WRONG:
+            metrics.increment("emoji_validation.local")
+            metrics.increment("emoji_validation.local_wrong")
+            return {"correct": False, "comment": f"Not even close! It was **{game_data['answer']}** <:xd:1196021200367919234>"}
+        return None
+
+    def create_emoji_combination(self, min_emojis=2, max_emojis=5):
         num_emojis = random.randint(min_emojis, max_emojis)
-        if len(valid_emojis) >= num_emojis:
-            emoji_combination = random.sample(valid_emojis, num_emojis)
-            question_emojis = ''.join([emoji['character'] for emoji in emoji_combination])
-            return question_emojis
-        return ''
\ No newline at end of file
+        return self.emoji_catalog.sample(num_emojis)
+
+
+# Shared by everything that touches the emoji game, so there is a single set of active games
+emoji_service = EmojiService()
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+from app.services.database_service import DatabaseService
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+class GameStateStore:
+    """In-memory per-user game state with a TTL, a size bound and optional SQLite snapshots.
+
+    Entries expire ttl_seconds after they were last written. When max_entries is reached the oldest entry is
+    dropped. With persist=True every write is mirrored to the game_state_snapshots table and live entries are
+    loaded back on startup, so games in progress survive a restart. Values must be json serializable.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int, max_entries: int, persist: bool = False):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # key -> (expires_at, value, size), oldest first
+        self._bytes = 0  # serialized size of the stored values, kept up to date by every add and remove
+        self._lock = threading.Lock()  # games are started and answered from to_thread workers
+        if persist:
+            self.database_service = DatabaseService()
+            self._initialize_snapshot_table()
+            self._restore()
+        self._update_gauges()
+
+    def _initialize_snapshot_table(self):
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS game_state_snapshots (
+                store TEXT NOT NULL,
+                key INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                expires_at INTEGER NOT NULL,
+                PRIMARY KEY (store, key)
+            )""")
+            conn.commit()
+
+    def _restore(self):
+        now = time.time()
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM game_state_snapshots WHERE store = ? AND expires_at <= ?", (self.name, now))
+            cursor.execute("SELECT key, data, expires_at FROM game_state_snapshots WHERE store = ? ORDER BY expires_at",
+                           (self.name,))
+            rows = cursor.fetchall()
+            conn.commit()
+        for key, data, expires_at in rows[-self.max_entries:]:
+            self._entries[key] = (expires_at, json.loads(data), len(data))
+            self._bytes += len(data)
+        if rows:
+            logger.info(f"Restored {len(self._entries)} {self.name} games from snapshot")
+
+    def _save_snapshot(self, key: int, data: str, expires_at: float):
+        with sqlite3.connect(self.database_service.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO game_state_snapshots (store, key, data, expires_at) VALUES (?, ?, ?, ?)",
+                         (self.name, key, data, int(expires_at)))
+            conn.commit()
+
+    def _delete_snapshots(self, keys):
+        with sqlite3.connect(self.database_service.path) as conn:
+            conn.executemany("DELETE FROM game_state_snapshots WHERE store = ? AND key = ?",
+                             [(self.name, key) for key in keys])
+            conn.commit()
+
+    def _update_gauges(self):
+        metrics.set_gauge(f"game_state.{self.name}.live", len(self._entries))
+        # rough size of the stored values, good enough to notice a leak
+        metrics.set_gauge(f"game_state.{self.name}.bytes", self._bytes)
+
+    def _remove(self, key: int):
+        """Drops key and its size from the total. Call it with the lock held. Returns the entry or None."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+        return entry
+
+    def set(self, key: int, value: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_seconds
+        data = json.dumps(value, ensure_ascii=False)
+        evicted = []
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, value, len(data))
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                evicted.append(oldest)
+        if evicted:
+            metrics.increment(f"game_state.{self.name}.evicted", len(evicted))
+        if self.persist:
+            self._save_snapshot(key, data, expires_at)
+            if evicted:
+                self._delete_snapshots(evicted)
+        self._update_gauges()
+
+    def get(self, key: int, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            return default
+        return entry[1]
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def pop(self, key: int, default=None):
+        """Removes and returns the entry. Only one caller gets it, so a game can't be answered twice."""
+        with self._lock:
+            entry = self._remove(key)
+        if entry is None:
+            return default
+        if self.persist:
+            self._delete_snapshots([key])
+        self._update_gauges()
+        return entry[1] if entry[0] > time.time() else default
+
+    def sweep(self) -> int:
+        """Drops expired entries. Returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+            for key in expired:
+                self._remove(key)
+        if expired:
+            metrics.increment(f"game_state.{self.name}.expired", len(expired))
+            if self.persist:
+                self._delete_snapshots(expired)
+            logger.info(f"Swept {len(expired)} expired {self.name} games")
+        self._update_gauges()
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import random
+from typing import Mapping, NamedTuple, Optional
+
+import aiohttp
+
+from app.config import Config
+from app.utils.logger import logger
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD"}  # only idempotent requests are retried
+
+
+class HttpStatusError(aiohttp.ClientError):
+    """Raised by HttpResponse.raise_for_status, a ClientError so existing `except aiohttp.ClientError` still apply."""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+
+class HttpResponse(NamedTuple):
+    """A fully read response, so the connection is back in the pool before the caller looks at it."""
+    status: int
+    url: str
+    headers: Mapping[str, str]
+    body: bytes
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HttpStatusError(self.status, self.url)
+
+
+class HttpClient:
+    """The bot's single aiohttp session: pooled keep-alive connections, cached DNS, per-host connection limits,
+    a default timeout and retries with exponential backoff for idempotent requests.
+
+    Started before the cogs load and closed on shutdown by bot.py. Code running in a worker thread can use
+    request_from_thread, which runs the request on the bot's event loop.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        self._loop = asyncio.get_running_loop()
+        connector = aiohttp.TCPConnector(
+            limit=Config.HTTP_MAX_CONNECTIONS,
+            limit_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.HTTP_TIMEOUT),
+            headers={"User-Agent": "CoolerAiChan/1.0"},
+        )
+        logger.info("HTTP client started")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client closed")
+        self._session = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client is not started")
+        return self._session
+
+    async def request(self, method: str, url: str, *, retries: int = None, **kwargs) -> HttpResponse:
+        """Sends a request and reads the whole response. kwargs go to aiohttp (params, headers, timeout, json...).
+
+        Connection errors, timeouts and 429/5xx answers are retried for GET and HEAD, waiting 0.5s, 1s, 2s...
+        (or the server's Retry-After) in between. The last failure is raised, or returned if it was a status.
+        """
+        if retries is None:
+            retries = Config.HTTP_RETRIES if method.upper() in RETRY_METHODS else 0
+        for attempt in range(retries + 1):
+            delay = Config.HTTP_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.8, 1.2)
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    body = await response.read()
+                    result = HttpResponse(response.status, str(response.url), response.headers, body)
+                if result.status not in RETRY_STATUSES or attempt == retries:
+                    return result
+                retry_after = result.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), 30.0)
+                logger.warning(f"{method} {url} answered {result.status}, retrying in {delay:.1f}s")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs):
+        """GET that raises HttpStatusError for 4xx/5xx answers and returns the decoded json body."""
+        response = await self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def request_from_thread(self, method: str, url: str, wait: float = 60, **kwargs) -> HttpResponse:
+        """Blocking, for worker threads only: runs request on the bot's event loop and waits for the response."""
+        if self._loop is None:
+            raise RuntimeError("HTTP client is not started")
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            raise RuntimeError("request_from_thread would block the event loop, await request instead")
+        future = asyncio.run_coroutine_threadsafe(self.request(method, url, **kwargs), self._loop)
+        return future.result(wait)
+
+
+async def request_once(method: str, url: str, **kwargs) -> HttpResponse:
+    """For scripts running without the bot: sends one request through a client of its own and closes it."""
+    client = HttpClient()
+    await client.start()
+    try:
+        return await client.request(method, url, **kwargs)
+    finally:
+        await client.close()
+
+
+http_client = HttpClient()
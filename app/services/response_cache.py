@@ -0,0 +1,90 @@
+import asyncio
+import random
+import time
+from typing import NamedTuple
+
+from app.services.http_client import HttpResponse, http_client
+from app.utils.cache import SingleFlight, TTLCache
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+class CachePolicy(NamedTuple):
+    ttl: float  # seconds a 200 answer is served as is
+    stale_ttl: float = 0  # seconds after that it is still served while a background refresh runs
+    negative_ttl: float = 60  # seconds a 404 answer is remembered
+    variants: int = 1  # >1 for endpoints that answer randomly, keeps that many answers so repeats stay varied
+
+
+class _Entry(NamedTuple):
+    response: HttpResponse
+    fresh_until: float
+
+
+class ResponseCache:
+    """GET responses of external apis, cached per endpoint policy in front of the shared HTTP client.
+
+    A fresh answer is served from memory. A stale one (within stale_ttl) is served immediately too, and a single
+    background request refreshes it. 404s are cached for negative_ttl, other errors are never cached. Concurrent
+    misses for the same request share one upstream call. Hits, stale hits and misses are counted per endpoint as
+    response_cache.<endpoint>.*, with the hit rate as a gauge.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self._entries = TTLCache(ttl_seconds=0, max_entries=max_entries)  # every entry is stored with its own ttl
+        self._single_flight = SingleFlight()
+        self._refreshing = set()  # background refresh tasks, referenced so they aren't garbage collected
+
+    async def get(self, endpoint: str, url: str, policy: CachePolicy, params: dict = None) -> HttpResponse:
+        key = (url, tuple(sorted((params or {}).items())), random.randrange(policy.variants))
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry.fresh_until:
+                self._count(endpoint, "hit")
+            else:
+                self._count(endpoint, "stale")
+                self._refresh_in_background(endpoint, key, url, policy, params)
+            return entry.response
+        self._count(endpoint, "miss")
+        return await self._single_flight.run(key, lambda: self._fetch(endpoint, key, url, policy, params))
+
+    async def get_json(self, endpoint: str, url: str, policy: CachePolicy, params: dict = None):
+        response = await self.get(endpoint, url, policy, params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch(self, endpoint, key, url, policy, params) -> HttpResponse:
+        response = await http_client.get(url, params=params)
+        if response.status == 200:
+            self._store(key, response, policy.ttl, policy.stale_ttl)
+        elif response.status == 404:
+            self._store(key, response, policy.negative_ttl, 0)
+            metrics.increment(f"response_cache.{endpoint}.negative")
+        return response
+
+    def _store(self, key, response, ttl, stale_ttl):
+        if ttl > 0:
+            self._entries.set(key, _Entry(response, time.monotonic() + ttl), ttl_seconds=ttl + stale_ttl)
+
+    def _refresh_in_background(self, endpoint, key, url, policy, params):
+        if self._single_flight.is_running(key):
+            return
+        task = asyncio.create_task(self._refresh(endpoint, key, url, policy, params))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, endpoint, key, url, policy, params):
+        try:
+            await self._single_flight.run(key, lambda: self._fetch(endpoint, key, url, policy, params))
+        except Exception as e:
+            logger.error(f"Background refresh of {endpoint} failed, keeping the stale answer: {e!r}")
+
+    @staticmethod
+    def _count(endpoint, outcome):
+        metrics.increment(f"response_cache.{endpoint}.{outcome}")
+        served = metrics.get(f"response_cache.{endpoint}.hit") + metrics.get(f"response_cache.{endpoint}.stale")
+        total = served + metrics.get(f"response_cache.{endpoint}.miss")
+        metrics.set_gauge(f"response_cache.{endpoint}.hit_rate", round(served / total, 3))
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+class CachedTile(NamedTuple):
+    data: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool  # False once the layer's ttl has passed, the tile should be revalidated before use
+
+    def validators(self) -> dict:
+        """Headers for a conditional request, the server answers 304 if the tile didn't change."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class TileCache:
+    """Map tiles on disk, keyed by (layer, z, x, y), at <directory>/<layer>/<z>/<x>/<y>.png.
+
+    Next to every tile a small json file keeps when it was fetched and its ETag/Last-Modified, so stale tiles can
+    be revalidated instead of downloaded again. How long a tile stays fresh depends on its layer (ttls, seconds).
+    The cache is capped at max_bytes, the least recently used tiles are deleted first. Files are written to a
+    temporary file and renamed, so a crash never leaves half a tile behind.
+
+    Every method touches the disk, call them through asyncio.to_thread.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttls: dict, default_ttl: int = 300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> tile size in bytes, least recently used first
+        self._loaded = False
+        self.total_bytes = 0
+
+    def _paths(self, key):
+        layer, zoom, x, y = key
+        base = os.path.join(self.directory, layer, str(zoom), str(x), str(y))
+        return base + ".png", base + ".json"
+
+    def _ensure_loaded(self):
+        """Builds the LRU index from the files on disk, oldest modification time first. Runs once."""
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)  # left over from a write that never finished
+                    continue
+                if not name.endswith(".png"):
+                    continue
+                parts = os.path.relpath(path, self.directory)[:-len(".png")].split(os.sep)
+                if len(parts) != 4:
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, (parts[0], int(parts[1]), int(parts[2]), int(parts[3])), stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+        logger.info(f"Tile cache: {len(self._entries)} tiles, {self.total_bytes / 1e6:.1f} MB")
+
+    def get(self, layer: str, zoom: int, x: int, y: int) -> Optional[CachedTile]:
+        key = (layer, zoom, x, y)
+        with self._lock:
+            self._ensure_loaded()
+            if key not in self._entries:
+                metrics.increment("tile_cache.miss")
+                return None
+            self._entries.move_to_end(key)
+            tile_path, meta_path = self._paths(key)
+            try:
+                with open(tile_path, "rb") as f:
+                    data = f.read()
+                os.utime(tile_path)  # keeps the LRU order across restarts
+            except FileNotFoundError:
+                self._forget(key)
+                metrics.increment("tile_cache.miss")
+                return None
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                meta = {}
+        fresh = time.time() - meta.get("fetched_at", 0) < self.ttls.get(layer, self.default_ttl)
+        metrics.increment("tile_cache.hit" if fresh else "tile_cache.stale")
+        return CachedTile(data, meta.get("etag"), meta.get("last_modified"), fresh)
+
+    def put(self, layer: str, zoom: int, x: int, y: int, data: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        key = (layer, zoom, x, y)
+        tile_path, meta_path = self._paths(key)
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+            self._write_atomic(tile_path, data)
+            self._write_meta(meta_path, etag, last_modified)
+            self.total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def refresh(self, layer: str, zoom: int, x: int, y: int, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Marks a stale tile as fresh again, after the server answered 304 Not Modified."""
+        key = (layer, zoom, x, y)
+        with self._lock:
+            if key not in self._entries:
+                return
+            tile_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                meta = {}
+            self._write_meta(meta_path, etag or meta.get("etag"), last_modified or meta.get("last_modified"))
+        metrics.increment("tile_cache.revalidated")
+
+    def _write_meta(self, meta_path, etag, last_modified):
+        meta = {"fetched_at": time.time(), "etag": etag, "last_modified": last_modified}
+        self._write_atomic(meta_path, json.dumps(meta).encode())
+
+    @staticmethod
+    def _write_atomic(path, data: bytes):
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+
+    def _forget(self, key):
+        self.total_bytes -= self._entries.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._forget(key)
+            metrics.increment("tile_cache.evicted")
+        metrics.set_gauge("tile_cache.bytes", self.total_bytes)
+        metrics.set_gauge("tile_cache.tiles", len(self._entries))
@@ -0,0 +1,107 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from app.services.database_service import DatabaseService
+from app.config import Config
+from app.utils.logger import logger
+
+
+class TokenLedger:
+    """Records AI token usage per user, command, model and api key and enforces daily quotas."""
+
+    def __init__(self):
+        self.database_service = DatabaseService()
+        self.default_daily_quota = Config.AI_DAILY_TOKEN_QUOTA
+        self._initialize_ledger_tables()
+
+    def _initialize_ledger_tables(self):
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS token_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                command TEXT,
+                model TEXT,
+                key_index INTEGER,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                total_tokens INTEGER DEFAULT 0,
+                day TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_ledger_user_day ON token_ledger (user_id, day)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_ledger_day ON token_ledger (day)")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS token_quotas (
+                user_id INTEGER PRIMARY KEY,
+                daily_limit INTEGER NOT NULL
+            )""")
+            conn.commit()
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def record_usage(self, user_id: Optional[int], command: Optional[str], model: str, key_index: Optional[int],
+                     prompt_tokens: int, completion_tokens: int):
+        try:
+            with sqlite3.connect(self.database_service.path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO token_ledger (user_id, command, model, key_index, prompt_tokens, completion_tokens, total_tokens, day)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (user_id, command or "other", model, key_index, prompt_tokens, completion_tokens,
+                     prompt_tokens + completion_tokens, self.today()))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record token usage: {e}")
+
+    def get_user_usage_today(self, user_id: int) -> int:
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT SUM(total_tokens) FROM token_ledger WHERE user_id = ? AND day = ?", (user_id, self.today()))
+            return cursor.fetchone()[0] or 0
+
+    def get_daily_usage(self, day: str = None) -> list:
+        """Returns (user_id, command, model, prompt_tokens, completion_tokens, requests) rows for the given day."""
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT user_id, command, model, SUM(prompt_tokens), SUM(completion_tokens), COUNT(*)
+            FROM token_ledger
+            WHERE day = ?
+            GROUP BY user_id, command, model
+            ORDER BY SUM(total_tokens) DESC""", (day or self.today(),))
+            return cursor.fetchall()
+
+    def set_quota(self, user_id: int, daily_limit: int):
+        """Sets a daily token limit for the user, 0 or less removes the custom limit."""
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            if daily_limit > 0:
+                cursor.execute("""
+                INSERT INTO token_quotas (user_id, daily_limit) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET daily_limit = excluded.daily_limit""", (user_id, daily_limit))
+            else:
+                cursor.execute("DELETE FROM token_quotas WHERE user_id = ?", (user_id,))
+            conn.commit()
+
+    def get_quota(self, user_id: int) -> int:
+        """Returns the user's daily limit, 0 means unlimited."""
+        with sqlite3.connect(self.database_service.path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT daily_limit FROM token_quotas WHERE user_id = ?", (user_id,))
+            result = cursor.fetchone()
+        return result[0] if result else self.default_daily_quota
+
+    def check_quota(self, user_id: int, estimated_tokens: int) -> Tuple[bool, int, int]:
+        """Checks if the user can spend estimated_tokens more today. Returns (allowed, used_today, daily_limit)."""
+        daily_limit = self.get_quota(user_id)
+        if daily_limit <= 0 or user_id == Config.master_user_id:
+            return True, 0, daily_limit
+        used = self.get_user_usage_today(user_id)
+        return used + estimated_tokens <= daily_limit, used, daily_limit
+
+
+token_ledger = TokenLedger()
@@ -1,18 +1,109 @@
+import asyncio
 import math
-import requests
+import os
+import threading
+import time
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image, ImageDraw
 from app.config import Config
+from app.services.http_client import http_client
+from app.services.tile_cache import TileCache
+from app.utils.cache import SingleFlight, TTLCache
 from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+OSM_TILE_URL = "https://tile.openstreetmap.org/{zoom}/{x}/{y}.png"
+TOMORROW_TILE_URL = "https://api.tomorrow.io/v4/map/tile/{zoom}/{x}/{y}/{layer}/now.png?apikey={api_key}"
+GEOCODING_URL = "http://api.openweathermap.org/geo/1.0/direct"
+CURRENT_WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+BASE_LAYER = "osm"
+WEATHER_LAYERS = ("temperature", "precipitationIntensity")  # drawn in this order, precipitation on top
+
+# OSM tiles barely change (and their tile policy asks to cache them for days), tomorrow.io updates every few minutes
+tile_cache = TileCache(
+    os.path.join(os.getcwd(), "app", "persistent_data", "tile_cache"),
+    max_bytes=Config.WEATHER_TILE_CACHE_MB * 1024 * 1024,
+    ttls={
+        BASE_LAYER: Config.WEATHER_BASE_TILE_TTL_DAYS * 86400,
+        **{layer: Config.WEATHER_LAYER_TILE_TTL_MINUTES * 60 for layer in WEATHER_LAYERS},
+    },
+)
+_coordinates_cache = TTLCache(Config.WEATHER_GEOCODE_CACHE_DAYS * 86400, max_entries=10000)  # normalized city -> (lat, lon)
+_UNKNOWN_CITY = ()  # cached for cities the geocoding api doesn't know
+_weather_cache = TTLCache(Config.WEATHER_CACHE_MINUTES * 60, max_entries=1000)  # (lat, lon) -> weather data
+# rendered maps, keyed by footprint and weather layer update, so they are stale when the layers change anyway
+_map_cache = TTLCache(Config.WEATHER_LAYER_TILE_TTL_MINUTES * 60, max_entries=1000, max_bytes=Config.WEATHER_MAP_CACHE_MB * 1024 * 1024)
+_single_flight = SingleFlight()
+
+WEATHER_LAYER_OPACITY = 0.6
+_OPACITY_TABLE = [round(alpha * WEATHER_LAYER_OPACITY) for alpha in range(256)]
+MAP_SIZE = 512  # 2x2 tiles of 256 pixels
+PNG_COMPRESS_LEVEL = 3  # zlib level 6 (Pillow's default) takes about three times longer for maps of about the same size
+_render_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-map")
+_canvases = threading.local()  # one reusable map canvas per render thread
+
+
+def _tile_position(index):
+    return 256 * (index % 2), 256 * (index // 2)
+
+
+def _get_canvas():
+    """The calling thread's map canvas, cleared. Reused for every map that thread renders."""
+    canvas = getattr(_canvases, "canvas", None)
+    if canvas is None:
+        canvas = _canvases.canvas = Image.new('RGBA', (MAP_SIZE, MAP_SIZE), (0, 0, 0, 0))
+    else:
+        canvas.paste((0, 0, 0, 0), (0, 0, MAP_SIZE, MAP_SIZE))
+    return canvas
+
+
+def render_map(base_tiles, layer_tiles, city_x, city_y):
+    """Blocking. Builds the map PNG from the downloaded tiles, see WeatherService.fetch_tiles.
+
+    Missing tiles stay blank. Returns None if every base tile is missing.
+    """
+    if not any(base_tiles):
+        return None
+    canvas = _get_canvas()
+    for i, tile in enumerate(base_tiles):
+        if tile is not None:
+            canvas.paste(Image.open(BytesIO(tile)).convert("RGBA"), _tile_position(i))
+
+    # Each weather tile goes straight onto the map with its alpha scaled down, layers in WEATHER_LAYERS order
+    for layer in WEATHER_LAYERS:
+        for i, tile in enumerate(layer_tiles[layer]):
+            if tile is None:
+                continue
+            tile_image = Image.open(BytesIO(tile)).convert("RGBA")
+            tile_image.putalpha(tile_image.getchannel("A").point(_OPACITY_TABLE))
+            canvas.alpha_composite(tile_image, _tile_position(i))
+
+    # Mark the city location
+    draw = ImageDraw.Draw(canvas)
+    draw.ellipse([city_x-5, city_y-5, city_x+5, city_y+5], fill='red', outline='white')
+
+    image_bytes = BytesIO()
+    canvas.save(image_bytes, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    return image_bytes.getvalue()
+
 
 class WeatherService:
     def __init__(self):
         self.openweather_api_key = Config.OPENWEATHER_API_KEY
         self.tomorrow_api_key = Config.TOMORROW_API_KEY
         self.user_agent = {"User-Agent": "DiscordWeatherBot/1.0"}
+        # a slow tile is left out (or served stale) rather than retried, the map shouldn't wait for it
+        self.tile_timeout = aiohttp.ClientTimeout(total=Config.WEATHER_TILE_TIMEOUT)
 
     async def create_centered_weather_map(self, lat, lon, zoom, city):
-        """Creates a centered weather map for given coordinates and zoom level."""
+        """Returns the PNG bytes of a weather map centered on the coordinates, or None if it couldn't be made.
+
+        Maps are cached in memory by what they show: the tiles they cover, where the city marker sits and the weather
+        layer update they use, so every spelling of a city shares one map until the weather layers change.
+        """
         try:
             # Calculate tile coordinates
             tile_x, tile_y = self.lat_lon_to_tile(lat, lon, zoom)
@@ -22,34 +113,35 @@ class WeatherService:
             
             # Determine which tiles to fetch
             tiles_to_fetch = self.get_tiles_to_fetch(tile_x, tile_y, pixel_x, pixel_y)
+            city_x = pixel_x + 256 * (1 if pixel_x < 128 else 0)
+            city_y = pixel_y + 256 * (1 if pixel_y < 128 else 0)
             
-            # Fetch and combine tiles
-            combined_image = await self.fetch_and_combine_tiles(tiles_to_fetch, zoom)
+            layer_update = int(time.time() // (Config.WEATHER_LAYER_TILE_TTL_MINUTES * 60))
+            key = ("map", zoom, tuple(tiles_to_fetch), city_x, city_y, layer_update)
+            image_bytes = _map_cache.get(key)
+            if image_bytes is not None:
+                metrics.increment("weather.map_cache_hit")
+                return image_bytes
+            metrics.increment("weather.map_cache_miss")
             
-            if combined_image:
-                # Add weather layers
-                weather_layers = await self.fetch_weather_layers(tiles_to_fetch, zoom)
-                for layer in weather_layers:
-                    combined_image = Image.alpha_composite(combined_image, layer)
-                
-                # Mark the city location
-                draw = ImageDraw.Draw(combined_image)
-                city_x = pixel_x + 256 * (1 if pixel_x < 128 else 0)
-                city_y = pixel_y + 256 * (1 if pixel_y < 128 else 0)
-                draw.ellipse([city_x-5, city_y-5, city_x+5, city_y+5], fill='red', outline='white')
-                
-                # Save the combined image
-                combined_image_bytes = BytesIO()
-                combined_image.save(combined_image_bytes, format='PNG')
-                combined_image_bytes.seek(0)
-                
-                return combined_image_bytes
-            else:
-                logger.error("Failed to create combined image")
+            image_bytes = await _single_flight.run(key, lambda: self.render_centered_map(tiles_to_fetch, zoom, city_x, city_y))
+            if image_bytes:
+                _map_cache.set(key, image_bytes)
+                metrics.set_gauge("weather.map_cache_bytes", _map_cache.total_bytes)
+                return image_bytes
+            logger.error("Failed to create combined image")
         except Exception as e:
             logger.error(f"An error occurred while creating centered weather map: {e}")
         return None
 
+    async def render_centered_map(self, tiles, zoom, city_x, city_y):
+        # Download the base map and every weather layer at once
+        base_tiles, layer_tiles = await self.fetch_tiles(tiles, zoom)
+        
+        # Decoding, compositing and encoding take tens of milliseconds, keep them off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_render_pool, render_map, base_tiles, layer_tiles, city_x, city_y)
+
     @staticmethod
     def lat_lon_to_tile(lat, lon, zoom):
         lat_rad = math.radians(lat)
@@ -94,89 +186,175 @@ class WeatherService:
                 ]
 
 
-    async def fetch_and_combine_tiles(self, tiles, zoom):
-        combined_image = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-        for i, (x, y) in enumerate(tiles):
-            satellite_url = f"https://tile.openstreetmap.org/{zoom}/{x}/{y}.png"
-            response = requests.get(satellite_url, headers=self.user_agent)
-            if response.status_code == 200:
-                tile_image = Image.open(BytesIO(response.content)).convert("RGBA")
-                combined_image.paste(tile_image, (256 * (i % 2), 256 * (i // 2)))
-            else:
-                logger.error(f"Failed to fetch tile at {x},{y}. Status code: {response.status_code}")
+    def tile_url(self, layer, zoom, x, y):
+        if layer == BASE_LAYER:
+            return OSM_TILE_URL.format(zoom=zoom, x=x, y=y)
+        return TOMORROW_TILE_URL.format(zoom=zoom, x=x, y=y, layer=layer, api_key=self.tomorrow_api_key)
+
+    async def fetch_tile(self, layer, zoom, x, y):
+        """Returns the bytes of one tile, from the disk cache when it is fresh, or None if it can't be had.
+
+        A stale tile is revalidated with a conditional request. If the download fails the stale tile is used anyway,
+        an old tile is better than a hole in the map.
+        """
+        label = f"{layer} tile {zoom}/{x}/{y}"
+        cached = await asyncio.to_thread(tile_cache.get, layer, zoom, x, y)
+        if cached is not None and cached.fresh:
+            return cached.data
+        headers = cached.validators() if cached is not None else {}
+        try:
+            response = await http_client.get(self.tile_url(layer, zoom, x, y), headers={**self.user_agent, **headers},
+                                             timeout=self.tile_timeout, retries=0)
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if response.status == 304 and cached is not None:
+                await asyncio.to_thread(tile_cache.refresh, layer, zoom, x, y, etag, last_modified)
+                return cached.data
+            if response.status == 200:
+                await asyncio.to_thread(tile_cache.put, layer, zoom, x, y, response.body, etag, last_modified)
+                return response.body
+            logger.error(f"Failed to fetch {label}. Status code: {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to fetch {label}: {e!r}")
+        if cached is not None:
+            logger.warning(f"Using stale {label}")
+            return cached.data
+        return None
+
+    async def fetch_tiles(self, tiles, zoom):
+        """Downloads the base map tiles and every weather layer tile concurrently.
+
+        Returns (base_tiles, layer_tiles): a list with the bytes of each base tile, and a dict mapping each weather
+        layer to such a list. A tile that failed is None, so one slow or broken tile doesn't sink the whole map.
+        """
+        downloads = [self.fetch_tile(layer, zoom, x, y) for layer in (BASE_LAYER,) + WEATHER_LAYERS for x, y in tiles]
+        results = await asyncio.gather(*downloads)
+        count = len(tiles)
+        base_tiles = results[:count]
+        layer_tiles = {layer: results[count * (i + 1):count * (i + 2)] for i, layer in enumerate(WEATHER_LAYERS)}
+        return base_tiles, layer_tiles
+
+    @staticmethod
+    def normalize_city(city: str) -> str:
+        return " ".join(city.casefold().split())
+
+    async def get_json(self, url, params):
+        return await http_client.get_json(url, params={**params, "appid": self.openweather_api_key})
+
+    async def get_coordinates(self, city: str):
+        """Resolves a city name to (lat, lon) with OpenWeather's geocoding, cached for a long time. None if unknown."""
+        key = self.normalize_city(city)
+        coordinates = _coordinates_cache.get(key)
+        if coordinates is None:
+            coordinates = await _single_flight.run(("geocode", key), lambda: self._geocode(key))
+        return coordinates or None
+
+    async def _geocode(self, key):
+        places = await self.get_json(GEOCODING_URL, {"q": key, "limit": 1})
+        if not places:
+            # remembered for a while, so repeating a typo doesn't ask the api again
+            _coordinates_cache.set(key, _UNKNOWN_CITY, ttl_seconds=Config.WEATHER_GEOCODE_MISS_CACHE_MINUTES * 60)
+            return None
+        coordinates = (round(places[0]["lat"], 2), round(places[0]["lon"], 2))  # ~1 km, nearby lookups share the cache
+        _coordinates_cache.set(key, coordinates)
+        return coordinates
+
+    async def get_weather_data(self, city: str):
+        """Current weather and the next 24 hours of forecast for a city, None if it can't be fetched.
+
+        Cached per coordinates for a few minutes, so "London" and "london, gb" share an entry, and concurrent
+        requests for the same place share one upstream fetch.
+        """
+        try:
+            coordinates = await self.get_coordinates(city)
+            if coordinates is None:
+                logger.error(f"Unknown city for weather data: {city}")
                 return None
-        return combined_image
-    
-    
+            weather = _weather_cache.get(coordinates)
+            if weather is not None:
+                metrics.increment("weather.cache_hit")
+                return weather
+            metrics.increment("weather.cache_miss")
+            if _single_flight.is_running(coordinates):
+                metrics.increment("weather.coalesced")
+            return await _single_flight.run(coordinates, lambda: self._fetch_weather_data(*coordinates))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error fetching weather data: {e!r}")
+            return None
 
-    async def fetch_weather_layers(self, tiles, zoom):
-        combined_layer = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+    async def _fetch_weather_data(self, lat, lon):
+        params = {"lat": lat, "lon": lon, "units": "metric"}
+        weather_data, forecast_data = await asyncio.gather(
+            self.get_json(CURRENT_WEATHER_URL, params),
+            self.get_json(FORECAST_URL, params),
+        )
         
+        current_weather = {
+            'temperature': weather_data['main']['temp'],
+            'feels_like': weather_data['main']['feels_like'],
+            'humidity': weather_data['main']['humidity'],
+            'pressure': weather_data['main']['pressure'],
+            'wind_speed': weather_data['wind']['speed'] * 3.6,  # Convert m/s to km/h
+            'wind_direction': weather_data['wind']['deg'],
+            'visibility': weather_data['visibility'],
+            'description': weather_data['weather'][0]['description'],
+            'icon_code': weather_data['weather'][0]['icon'],
+            'icon_url': f'http://openweathermap.org/img/wn/{weather_data["weather"][0]["icon"]}.png',
+            'lat': weather_data['coord']['lat'],
+            'lon': weather_data['coord']['lon'],
+        }
         
-        for i, (x, y) in enumerate(tiles):
-            temp_url = f"https://api.tomorrow.io/v4/map/tile/{zoom}/{x}/{y}/temperature/now.png?apikey={self.tomorrow_api_key}"
-            precip_url = f"https://api.tomorrow.io/v4/map/tile/{zoom}/{x}/{y}/precipitationIntensity/now.png?apikey={self.tomorrow_api_key}"
-            
-            temp_response = requests.get(temp_url)
-            precip_response = requests.get(precip_url)
-            
-            if temp_response.status_code == 200 and precip_response.status_code == 200:
-                temp_image = Image.open(BytesIO(temp_response.content)).convert("RGBA")
-                precip_image = Image.open(BytesIO(precip_response.content)).convert("RGBA")
-                
-                # Adjust opacity
-                temp_image = Image.blend(Image.new("RGBA", temp_image.size, (0, 0, 0, 0)), temp_image, 0.6)
-                precip_image = Image.blend(Image.new("RGBA", precip_image.size, (0, 0, 0, 0)), precip_image, 0.6)
-                
-                # Combine temperature and precipitation layers
-                tile_layer = Image.alpha_composite(temp_image, precip_image)
-                
-                # Paste into the correct position in the combined layer
-                combined_layer.paste(tile_layer, (256 * (i % 2), 256 * (i // 2)))
-            else:
-                logger.error(f"Failed to fetch weather layers for tile {x},{y}")
-        return [combined_layer]  # Return as a list to maintain compatibility with the existing code
-    
-    async def get_weather_data(self, city: str):
-        weather_url = f'http://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.openweather_api_key}&units=metric'
-        forecast_url = f'http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={self.openweather_api_key}&units=metric'
+        forecast = []
+        for item in forecast_data['list'][:8]:  # Next 24 hours (3-hour intervals)
+            forecast.append((
+                item['dt_txt'],
+                item['main']['temp'],
+                item['weather'][0]['description'],
+                item['pop'] * 100  # Probability of precipitation
+            ))
         
-        try:
-            weather_response = requests.get(weather_url)
-            weather_response.raise_for_status()
-            weather_data = weather_response.json()
-            
-            forecast_response = requests.get(forecast_url)
-            forecast_response.raise_for_status()
-            forecast_data = forecast_response.json()
-            
-            current_weather = {
-                'temperature': weather_data['main']['temp'],
-                'feels_like': weather_data['main']['feels_like'],
-                'humidity': weather_data['main']['humidity'],
-                'pressure': weather_data['main']['pressure'],
-                'wind_speed': weather_data['wind']['speed'] * 3.6,  # Convert m/s to km/h
-                'wind_direction': weather_data['wind']['deg'],
-                'visibility': weather_data['visibility'],
-                'description': weather_data['weather'][0]['description'],
-                'icon_code': weather_data['weather'][0]['icon'],
-                'icon_url': f'http://openweathermap.org/img/wn/{weather_data["weather"][0]["icon"]}.png',
-                'lat': weather_data['coord']['lat'],
-                'lon': weather_data['coord']['lon'],
-            }
-            
-            forecast = []
-            for item in forecast_data['list'][:8]:  # Next 24 hours (3-hour intervals)
-                forecast.append((
-                    item['dt_txt'],
-                    item['main']['temp'],
-                    item['weather'][0]['description'],
-                    item['pop'] * 100  # Probability of precipitation
-                ))
-            
-            current_weather['forecast'] = forecast
-            
-            return current_weather
-        except requests.RequestException as e:
-            logger.error(f"Error fetching weather data: {e}")
-            return None
\ No newline at end of file
+        current_weather['forecast'] = forecast
+        _weather_cache.set((lat, lon), current_weather)
+        return current_weather
+
+if __name__ == "__main__":
+    # Render benchmark with synthetic tiles: python -m app.services.weather_service [maps]
+    import sys
+
+    def _png(color, sigma, with_alpha):
+        tile = Image.new("RGB", (256, 256), color)
+        noise = Image.effect_noise((256, 256), sigma)
+        if with_alpha:
+            tile.putalpha(noise)
+        else:
+            tile = Image.blend(tile, noise.convert("RGB"), 0.3)
+        data = BytesIO()
+        tile.save(data, format="PNG")
+        return data.getvalue()
+
+    def render_map_before(base_tiles, layer_tiles, city_x, city_y):
+        """The old pipeline: fresh canvases, Image.blend against a transparent image for opacity."""
+        combined_image = Image.new('RGBA', (MAP_SIZE, MAP_SIZE), (0, 0, 0, 0))
+        for i, tile in enumerate(base_tiles):
+            combined_image.paste(Image.open(BytesIO(tile)).convert("RGBA"), _tile_position(i))
+        combined_layer = Image.new('RGBA', (MAP_SIZE, MAP_SIZE), (0, 0, 0, 0))
+        for i in range(len(base_tiles)):
+            temp_image = Image.open(BytesIO(layer_tiles[WEATHER_LAYERS[0]][i])).convert("RGBA")
+            precip_image = Image.open(BytesIO(layer_tiles[WEATHER_LAYERS[1]][i])).convert("RGBA")
+            temp_image = Image.blend(Image.new("RGBA", temp_image.size, (0, 0, 0, 0)), temp_image, 0.6)
+            precip_image = Image.blend(Image.new("RGBA", precip_image.size, (0, 0, 0, 0)), precip_image, 0.6)
+            combined_layer.paste(Image.alpha_composite(temp_image, precip_image), _tile_position(i))
+        combined_image = Image.alpha_composite(combined_image, combined_layer)
+        ImageDraw.Draw(combined_image).ellipse([city_x-5, city_y-5, city_x+5, city_y+5], fill='red', outline='white')
+        image_bytes = BytesIO()
+        combined_image.save(image_bytes, format='PNG')
+        return image_bytes.getvalue()
+
+    maps = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    base = [_png((170, 210, 160), 20 + i, False) for i in range(4)]
+    layers = {layer: [_png((220, 80 + 60 * n, 40), 60 + i, True) for i in range(4)] for n, layer in enumerate(WEATHER_LAYERS)}
+    for name, render in (("before", render_map_before), ("after", render_map)):
+        render(base, layers, 300, 300)  # warm up
+        started = time.perf_counter()
+        for _ in range(maps):
+            render(base, layers, 300, 300)
+        print(f"{name}: {(time.perf_counter() - started) / maps * 1000:.1f} ms per map")
@@ -1,11 +1,12 @@
 import asyncio
 from openai import OpenAI
 from app.utils.logger import logger
+from app.services.token_ledger_service import token_ledger
 client = OpenAI()
 from dotenv import load_dotenv
 load_dotenv() # load openai api key from .env file
 
-def send_to_openai(messages):
+def send_to_openai(messages, user_id=None, command=None):
     completion = client.chat.completions.create(model="gpt-4o", messages=messages, temperature=1.3)
     answer = completion.choices[0].message.content
     prompt_tokens = completion.usage.prompt_tokens
@@ -14,10 +15,11 @@ def send_to_openai(messages):
     logger.info(f"Prompt tokens: {prompt_tokens}")
     logger.info(f"Completion tokens: {completion_tokens}")
     logger.info(f"Total tokens: {total_tokens}")
+    token_ledger.record_usage(user_id, command, "gpt-4o", None, prompt_tokens, completion_tokens)
     #logger.info(f"Response: {answer}")
     return answer, prompt_tokens, completion_tokens, total_tokens
 
-async def send_to_openai_vision(question, image_url):
+async def send_to_openai_vision(question, image_url, user_id=None, command=None):
     completion = client.chat.completions.create(
         model="gpt-4o",
         messages=[
@@ -38,6 +40,7 @@ async def send_to_openai_vision(question, image_url):
     logger.info(f"Prompt tokens: {prompt_tokens}")
     logger.info(f"Completion tokens: {completion_tokens}")
     logger.info(f"Total tokens: {total_tokens}")
+    token_ledger.record_usage(user_id, command, "gpt-4o", None, prompt_tokens, completion_tokens)
     #logger.info(f"Response: {answer}")
     return answer, prompt_tokens, completion_tokens, total_tokens
 
@@ -55,7 +58,7 @@ async def ask_gpt(author, author_id, user_message):
         logger.error(f"Error in ask_question: {ex}")
         return "Sorry, something went wrong while processing your request."
 
-async def send_to_openai_gpt(messages):
+async def send_to_openai_gpt(messages, user_id=None, command=None):
     completion = await asyncio.to_thread(client.chat.completions.create, model="gpt-4o", messages=messages, temperature=0.7)
     answer = completion.choices[0].message.content
     prompt_tokens = completion.usage.prompt_tokens
@@ -64,5 +67,6 @@ async def send_to_openai_gpt(messages):
     logger.info(f"Prompt tokens: {prompt_tokens}")
     logger.info(f"Completion tokens: {completion_tokens}")
     logger.info(f"Total tokens: {total_tokens}")
+    token_ledger.record_usage(user_id, command, "gpt-4o", None, prompt_tokens, completion_tokens)
     #logger.info(f"Response: {answer}")
     return answer, prompt_tokens, completion_tokens, total_tokens
@@ -1,7 +1,16 @@
+import asyncio
+import threading
 import time
 from app.utils.logger import logger
 from groq import Groq
 from app.config import Config
+from app.utils.ai_related.hedged_requests import LatencyTracker, hedged_call
+from app.utils.ai_related.token_estimator import estimate_messages_tokens
+from app.services.token_ledger_service import token_ledger
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_VISION_MODEL = "llama-3.2-90b-vision-preview"
+TOKENS_PER_KEY_PER_MINUTE = 6000
 
 api_keys = Config.get_groq_api_keys()
 current_key_index = 0
@@ -10,6 +19,10 @@ client = Groq(api_key=api_keys[current_key_index])
 
 token_count = 0
 start_time = None
+# Requests run in worker threads and a hedged one overlaps the primary, so the key rotation state is locked
+key_lock = threading.Lock()
+latency_tracker = LatencyTracker()
+backup_clients = {}
 
 def reset_token_count():
     global token_count, start_time
@@ -17,76 +30,127 @@ def reset_token_count():
     start_time = None
 
 def rotate_api_key():
+    """Switches to the next key. Call it with key_lock held."""
     global current_key_index, client
     current_key_index = (current_key_index + 1) % len(api_keys)
     client = Groq(api_key=api_keys[current_key_index])
     logger.info(f"Rotated API key to: {current_key_index}")
 
-def send_to_groq(messages):
-    """Send a list of messages to the Groq API and return the response, prompt tokens, completion tokens, and total tokens."""
-    global token_count, start_time
+def reserve_key(estimated_tokens=0):
+    """Returns (key index, client) for the next request, rotating first if it would push the key over its per minute budget."""
+    global start_time
+    with key_lock:
+        # If this is the first request, or the minute is over, start a new window
+        if start_time is None or time.time() - start_time > 60:
+            reset_token_count()
+            start_time = time.time()
 
-    # If this is the first request, set the start time
-    if start_time is None:
-        start_time = time.time()
+        if token_count > 0 and token_count + estimated_tokens >= TOKENS_PER_KEY_PER_MINUTE:
+            rotate_api_key()
+            reset_token_count()
+            start_time = time.time()
+        return current_key_index, client
 
-    # Calculate elapsed time
-    elapsed_time = time.time() - start_time
-    
-    if elapsed_time > 60:
-        reset_token_count()
-        start_time = time.time()
+def add_tokens(tokens):
+    """Counts tokens against the current key's budget and returns the total in this rotation."""
+    global token_count
+    with key_lock:
+        token_count += tokens
+        return token_count
 
-    if token_count >= 6000:
-        rotate_api_key()
-        reset_token_count()
-        start_time = time.time()
 
-    completion = client.chat.completions.create(
-        model="llama-3.3-70b-versatile", 
+def complete_with_groq(messages):
+    """Blocking Groq completion without ledger bookkeeping. Returns (answer, prompt, completion, total tokens), model, key index."""
+    estimated_tokens = estimate_messages_tokens(messages)
+    key_index, key_client = reserve_key(estimated_tokens)
+    request_start = time.monotonic()
+    completion = key_client.chat.completions.create(
+        model=GROQ_MODEL, 
         messages=messages
     )
+    latency_tracker.record(time.monotonic() - request_start)
     answer = completion.choices[0].message.content
     prompt_tokens = completion.usage.prompt_tokens
     completion_tokens = completion.usage.completion_tokens
     total_tokens = completion.usage.total_tokens
+    # a hedged request that lost still used the key's budget, so it is always counted here
+    tokens_in_rotation = add_tokens(total_tokens)
     
     # Log token usage
     logger.info("-------- GROQ RESPONSE --------")
     logger.info(f"Prompt tokens: {prompt_tokens}")
     logger.info(f"Completion tokens: {completion_tokens}")
     logger.info(f"Total tokens: {total_tokens}")
-    logger.info(f"Total tokens in rotation: {token_count + total_tokens}")
+    logger.info(f"Total tokens in rotation: {tokens_in_rotation}")
+    logger.info(f"Estimated prompt tokens: {estimated_tokens}")
     logger.info("------------------------------")
     
-    token_count += total_tokens
-    return answer, prompt_tokens, completion_tokens, total_tokens
+    return (answer, prompt_tokens, completion_tokens, total_tokens), GROQ_MODEL, key_index
 
 
-async def send_to_groq_vision(question, image_url):
-    """Send question with picture, return the response, prompt tokens, completion tokens, and total tokens."""
-    global token_count, start_time
+def send_to_groq(messages, user_id=None, command=None):
+    """Send a list of messages to the Groq API and return the response, prompt tokens, completion tokens, and total tokens."""
+    result, model, key_index = complete_with_groq(messages)
+    token_ledger.record_usage(user_id, command, model, key_index, result[1], result[2])
+    return result
 
-    # If this is the first request, set the start time
-    if start_time is None:
-        start_time = time.time()
 
-    # Calculate elapsed time
-    elapsed_time = time.time() - start_time
-    
-    if elapsed_time > 60:
-        reset_token_count()
-        start_time = time.time()
-
-    if token_count >= 6000:
-        rotate_api_key()
-        reset_token_count()
-        start_time = time.time()
+def complete_with_backup_provider(messages):
+    """Blocking completion from the backup provider: the next Groq key if we have more than one, OpenAI otherwise.
+    Returns (answer, prompt, completion, total tokens), model, key index, like complete_with_groq."""
+    if len(api_keys) > 1:
+        with key_lock:
+            backup_index = (current_key_index + 1) % len(api_keys)
+            if backup_index not in backup_clients:
+                backup_clients[backup_index] = Groq(api_key=api_keys[backup_index])
+            backup_client = backup_clients[backup_index]
+        completion = backup_client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=messages
+        )
+        model, key_index = GROQ_MODEL, backup_index
+        logger.info(f"Backup response from Groq key: {backup_index}")
+    else:
+        from app.utils.ai_related.chatgpt_api import client as openai_client
+        completion = openai_client.chat.completions.create(
+            model=Config.AI_FALLBACK_OPENAI_MODEL,
+            messages=messages
+        )
+        model, key_index = Config.AI_FALLBACK_OPENAI_MODEL, None
+        logger.info(f"Backup response from OpenAI model: {Config.AI_FALLBACK_OPENAI_MODEL}")
+
+    answer = completion.choices[0].message.content
+    usage = completion.usage
+    return (answer, usage.prompt_tokens, usage.completion_tokens, usage.total_tokens), model, key_index
+
+
+async def send_to_groq_hedged(messages, user_id=None, command=None):
+    """Async send_to_groq with failover on errors and, if AI_HEDGING_ENABLED, a hedged backup request when Groq is slow.
+
+    The losing request of a hedge can't be stopped, its thread finishes and the provider bills it. Only the answer
+    the user gets is recorded in their ledger, the loser just counts towards the Groq key's per minute budget.
+    """
+    hedge_after = None
+    if Config.AI_HEDGING_ENABLED:
+        hedge_after = latency_tracker.percentile(Config.AI_HEDGE_PERCENTILE, Config.AI_HEDGE_DEFAULT_DELAY)
+
+    result, model, key_index = await hedged_call(
+        lambda: asyncio.to_thread(complete_with_groq, messages),
+        lambda: asyncio.to_thread(complete_with_backup_provider, messages),
+        hedge_after=hedge_after
+    )
+    await asyncio.to_thread(token_ledger.record_usage, user_id, command, model, key_index, result[1], result[2])
+    return result
+
+
+async def send_to_groq_vision(question, image_url, user_id=None, command=None):
+    """Send question with picture, return the response, prompt tokens, completion tokens, and total tokens."""
+    key_index, vision_client = reserve_key()
     print(f"Image URL in send to groq funciuons: {image_url}")
     
-    completion = client.chat.completions.create(
+    completion = vision_client.chat.completions.create(
         #model="llama3-70b-8192", 
-        model="llama-3.2-90b-vision-preview", 
+        model=GROQ_VISION_MODEL, 
         messages=[
             # this groq says tdont work now {"role": "system", "content": "You are Ai-Chan, the mascot of the Bakakats Discord server. You are a prankster who occasionally jokes around instead of helping. You love to troll everyone in the server, making jokes on expense of others and pinging users."},
             {
@@ -103,6 +167,6 @@ async def send_to_groq_vision(question, image_url):
     completion_tokens = completion.usage.completion_tokens
     total_tokens = completion.usage.total_tokens
     
-    token_count += total_tokens
-    logger.info(f"Total tokens in rotation: {token_count}")   
+    logger.info(f"Total tokens in rotation: {add_tokens(total_tokens)}")
+    await asyncio.to_thread(token_ledger.record_usage, user_id, command, GROQ_VISION_MODEL, key_index, prompt_tokens, completion_tokens)
     return answer, prompt_tokens, completion_tokens, total_tokens
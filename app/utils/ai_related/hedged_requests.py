@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import deque
+from app.utils.logger import logger
+
+
+class LatencyTracker:
+    """Keeps a sliding window of provider latencies so we know when a request is 'slow'."""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float, default: float) -> float:
+        """Returns the q-th percentile (0-1) of recorded latencies, or default if we don't have enough data yet."""
+        if len(self.samples) < self.min_samples:
+            return default
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+async def hedged_call(primary, secondary=None, hedge_after=None):
+    """Runs primary() and returns the first successful result.
+
+    If primary hasn't finished after hedge_after seconds, secondary() is fired too and whichever
+    finishes first wins, the other one gets cancelled. If primary fails, secondary is fired right away.
+    Both arguments are zero-argument coroutine functions.
+
+    Cancelling only stops waiting: a loser wrapping asyncio.to_thread keeps running in its thread until the
+    request completes, and its result is thrown away. Keep side effects such as billing out of the callables
+    and apply them to the returned result.
+    """
+    start = time.monotonic()
+    pending = {asyncio.create_task(primary())}
+    secondary_task = None
+    last_error = None
+
+    try:
+        while pending:
+            timeout = None
+            if secondary is not None and secondary_task is None and hedge_after is not None:
+                timeout = max(0.0, hedge_after - (time.monotonic() - start))
+
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                logger.info(f"Primary provider slower than {hedge_after:.2f}s, sending hedged request")
+                secondary_task = asyncio.create_task(secondary())
+                pending.add(secondary_task)
+                continue
+
+            for task in done:
+                if task.exception() is None:
+                    if task is secondary_task:
+                        logger.info(f"Hedged request won after {time.monotonic() - start:.2f}s")
+                    return task.result()
+                last_error = task.exception()
+                logger.warning(f"Provider request failed: {last_error}")
+
+            if secondary is not None and secondary_task is None:
+                logger.info("Primary provider failed, failing over to secondary")
+                secondary_task = asyncio.create_task(secondary())
+                pending.add(secondary_task)
+
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"Dropped {len(pending)} slower request(s), they still run to completion in the background")
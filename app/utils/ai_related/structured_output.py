@@ -0,0 +1,157 @@
+import json
+import re
+from typing import Any, Dict, Iterator, Optional
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+# Schemas are {field: (type or tuple of types, required)}
+EMOJI_QUESTION_SCHEMA = {
+    "question": (str, True),
+    "answer": (str, True),
+    "hint": (str, False),
+    "aliases": (list, False),
+}
+
+ANSWER_VALIDATION_SCHEMA = {
+    "correct": (bool, True),
+    "comment": (str, False),
+}
+
+_code_fence_pattern = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_trailing_comma_pattern = re.compile(r",\s*([}\]])")
+_smart_quotes = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def strip_code_fences(text: str) -> str:
+    """Returns the content of the first ```json fenced block, or the text unchanged if there is none."""
+    match = _code_fence_pattern.search(text)
+    return match.group(1) if match else text
+
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """Yields every top level {...} block in text, scanning braces and skipping the ones inside strings.
+
+    An object left open at the end of the text (truncated completion) is yielded with its braces closed.
+    """
+    depth = 0
+    start = None
+    in_string = False
+    escaped = False
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"' and depth > 0:
+            in_string = True
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield text[start:index + 1]
+                start = None
+
+    if start is not None and depth > 0:
+        tail = text[start:] + ('"' if in_string else "")
+        yield tail + "}" * depth
+
+
+def repair_json(candidate: str) -> str:
+    """Fixes the usual LLM json mistakes: smart quotes, trailing commas and python literals."""
+    repaired = candidate.translate(_smart_quotes)
+    repaired = _trailing_comma_pattern.sub(r"\1", repaired)
+    repaired = re.sub(r"\bTrue\b", "true", repaired)
+    repaired = re.sub(r"\bFalse\b", "false", repaired)
+    repaired = re.sub(r"\bNone\b", "null", repaired)
+    return repaired
+
+
+def iter_json_dicts(text: str) -> Iterator[Dict[str, Any]]:
+    """Yields every json object in an LLM response that parses, repairing it if needed."""
+    for candidate in iter_json_objects(strip_code_fences(text)):
+        for attempt in (candidate, repair_json(candidate)):
+            try:
+                data = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                yield data
+            break
+
+
+def parse_labeled_fields(text: str, schema: dict) -> Dict[str, Any]:
+    """Parses 'field: value' style answers. A value runs until the next known field label."""
+    labels = "|".join(re.escape(field) for field in schema)
+    pattern = re.compile(rf"^[\s*_`\"-]*({labels})[\s*_`\"]*[:=][*_`]*\s*(.*?)(?=^[\s*_`\"-]*(?:{labels})[\s*_`\"]*[:=]|\Z)",
+                         re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    data = {}
+    for field, value in pattern.findall(text):
+        field = field.lower()
+        if field not in data:
+            data[field] = value.strip().strip('"').strip()
+    return data
+
+
+def coerce_to_schema(data: Dict[str, Any], schema: dict) -> Optional[Dict[str, Any]]:
+    """Validates data against schema, converting obvious cases ("4" -> 4, "true" -> True). Returns None if invalid."""
+    result = dict(data)
+    for field, (expected_type, required) in schema.items():
+        value = data.get(field)
+        if value is None:
+            if required:
+                return None
+            continue
+
+        if expected_type is bool and isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in ("true", "yes"):
+                value = True
+            elif lowered in ("false", "no"):
+                value = False
+        elif expected_type is int and isinstance(value, str):
+            digits = re.search(r"-?\d+", value)
+            if digits:
+                value = int(digits.group(0))
+        elif expected_type is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif expected_type is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+
+        if expected_type is int and isinstance(value, bool):
+            return None
+        if not isinstance(value, expected_type):
+            return None
+        result[field] = value
+    return result
+
+
+def parse_structured_output(text: str, schema: dict, name: str, allow_labeled: bool = False) -> Optional[Dict[str, Any]]:
+    """Extracts and validates a structured answer from an LLM response.
+
+    Tries json first (with code fence stripping and repairs), then 'field: value' lines if allow_labeled.
+    Parse attempts and failures are counted in metrics under structured_output.<name>.
+    """
+    metrics.increment(f"structured_output.{name}.attempts")
+    data = None
+    if isinstance(text, str):
+        for parsed in iter_json_dicts(text):
+            data = coerce_to_schema(parsed, schema)
+            if data is not None:
+                break
+        if data is None and allow_labeled:
+            data = coerce_to_schema(parse_labeled_fields(text, schema), schema)
+
+    if data is None:
+        metrics.increment(f"structured_output.{name}.failures")
+        failure_rate = metrics.ratio(f"structured_output.{name}.failures", f"structured_output.{name}.attempts")
+        logger.warning(f"Failed to parse structured output for {name} (failure rate {failure_rate:.1%}): {text!r}")
+    return data
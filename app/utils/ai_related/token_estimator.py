@@ -0,0 +1,35 @@
+import re
+
+# Rough numbers for llama/gpt style BPE tokenizers, good enough for budgeting before we dispatch
+CHARS_PER_TOKEN = 4
+TOKENS_PER_WORD = 1.3
+MESSAGE_OVERHEAD_TOKENS = 4  # role + separators added by the chat template
+IMAGE_TOKENS = 1000  # flat guess for vision attachments
+
+_word_pattern = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in a piece of text without calling the provider."""
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_words = len(_word_pattern.findall(text)) * TOKENS_PER_WORD
+    return int(max(by_chars, by_words)) + 1
+
+
+def estimate_messages_tokens(messages) -> int:
+    """Estimates the prompt tokens of a chat completion message list (text and vision style content)."""
+    total = 0
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content", "")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        else:
+            for part in content:
+                if part.get("type") == "text":
+                    total += estimate_tokens(part.get("text", ""))
+                else:
+                    total += IMAGE_TOKENS
+    return total
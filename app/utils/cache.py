@@ -0,0 +1,78 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small in-memory cache for the event loop: entries expire after ttl_seconds, the least recently used
+    entry is dropped once there are more than max_entries. Not thread safe.
+
+    With max_bytes set, values must be bytes-like and the cache also stays under that many bytes in total.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024, max_bytes: int = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= time.monotonic():
+            self.pop(key)
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value, ttl_seconds: float = None):
+        self.pop(key)
+        self._entries[key] = (time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), value)
+        if self.max_bytes is not None:
+            self.total_bytes += len(value)
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            self.pop(next(iter(self._entries)))
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        if self.max_bytes is not None:
+            self.total_bytes -= len(entry[1])
+        return entry[1]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, self) is not self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key: the first caller starts the work, everyone asking for that
+    key while it runs awaits the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # key -> asyncio.Task
+
+    def is_running(self, key) -> bool:
+        return key in self._in_flight
+
+    async def run(self, key, coroutine_factory):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(coroutine_factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # one impatient caller being cancelled mustn't cancel the work the others are waiting for
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so it isn't reported as never retrieved if every caller left
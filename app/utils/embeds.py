@@ -1,11 +1,12 @@
-import aiohttp
 import discord
+from app.services.response_cache import CachePolicy, response_cache
+
+# nekos.life answers with a random image each time, keeping a few answers per endpoint keeps commands varied
+NEKOS_POLICY = CachePolicy(ttl=600, stale_ttl=3600, variants=8)
 
 async def create_embed_with_image(title, url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            data = await resp.json()
-            image_url = data.get("url")
+    data = await response_cache.get_json("nekos.life", url, NEKOS_POLICY)
+    image_url = data.get("url")
 
     embed = discord.Embed(title=title)
     embed.set_image(url=image_url)
@@ -0,0 +1,37 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """Tiny in-process metrics registry: counters and gauges, readable with the +metrics command."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # some counters are bumped from to_thread workers
+        self.counters = defaultdict(int)
+        self.gauges = {}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def set_gauge(self, name: str, value):
+        self.gauges[name] = value
+
+    def get(self, name: str, default=0):
+        if name in self.gauges:
+            return self.gauges[name]
+        return self.counters.get(name, default)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        total = self.counters.get(denominator, 0)
+        return self.counters.get(numerator, 0) / total if total else 0.0
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """Returns all counters and gauges whose name starts with prefix."""
+        with self._lock:
+            values = dict(self.counters)
+        values.update(self.gauges)
+        return {name: value for name, value in sorted(values.items()) if name.startswith(prefix)}
+
+
+metrics = Metrics()
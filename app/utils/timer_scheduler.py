@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+class TimerScheduler:
+    """Many timers on one coroutine: a min-heap of deadlines and a single task sleeping until the earliest one.
+
+    When a timer is due, callback(key) runs as its own short task. Keys are whatever identifies the timer (an alarm
+    id, a user id...). schedule() and cancel() are cheap: cancelled or rescheduled entries stay in the heap and are
+    skipped when they come up, the heap is rebuilt once they make up most of it. Deadlines are unix timestamps.
+    """
+
+    def __init__(self, name: str, callback):
+        self.name = name
+        self.callback = callback
+        self._heap = []  # (deadline, sequence, key), may hold outdated entries
+        self._sequence = itertools.count()  # breaks deadline ties, keys never get compared
+        self._deadlines = {}  # key -> deadline of the live timers
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._firing = set()  # callbacks still running, referenced so they aren't garbage collected
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def schedule(self, key, deadline: float):
+        """Starts the timer for key, or moves it if key already has one."""
+        if self._deadlines.get(key) == deadline:
+            return
+        earliest = self._heap[0][0] if self._heap else None
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+        self._compact_if_sparse()
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+
+    def cancel(self, key) -> bool:
+        """Stops the timer for key. Returns False if there was none."""
+        if self._deadlines.pop(key, None) is None:
+            return False
+        self._compact_if_sparse()
+        return True
+
+    def deadline(self, key) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._deadlines
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def _compact_if_sparse(self):
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [(deadline, next(self._sequence), key) for key, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) != deadline:
+                    continue  # cancelled or rescheduled
+                del self._deadlines[key]
+                task = asyncio.create_task(self._fire(key))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, key):
+        try:
+            await self.callback(key)
+        except Exception as e:
+            logger.error(f"{self.name} timer {key} failed: {e}")
@@ -1,29 +1,17 @@
-
-import requests
-import random
 from app.config import Config
+from app.services.emoji_catalog import EmojiCatalog
 emoji_key = Config.EMOJI_API_KEY
 
-def fetch_emojis():
-    url = f"https://emoji-api.com/emojis?access_key={emoji_key}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return []
-
-def create_emoji_combinations(emojis, num_combinations=5):
+def create_emoji_combinations(catalog, num_combinations=5):
     emoji_combinations = []
     for _ in range(num_combinations):
-        # Ensure only valid emoji characters are used
-        valid_emojis = [emoji for emoji in emojis if 'character' in emoji and emoji['character'].isprintable()]
-        if len(valid_emojis) >= 3:
-            emoji_combination = random.sample(valid_emojis, 3)
-            question_emojis = ''.join([emoji['character'] for emoji in emoji_combination])
+        # The catalog only keeps valid, printable emoji characters
+        question_emojis = catalog.sample(3)
+        if question_emojis:
             emoji_combinations.append(question_emojis)
     return emoji_combinations
 
-emojis = fetch_emojis()
-emoji_questions = create_emoji_combinations(emojis)
+catalog = EmojiCatalog(emoji_key)
+emoji_questions = create_emoji_combinations(catalog)
 
 print(emoji_questions)
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture
+def bot_env(tmp_path, monkeypatch):
+    """Working directory and api keys for importing modules that talk to Groq/OpenAI and SQLite at import time."""
+    pytest.importorskip("groq")
+    pytest.importorskip("openai")
+    monkeypatch.chdir(tmp_path)  # the database and caches are created under the working directory
+    monkeypatch.setenv("AI_GROQ_KEY1", "key-1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return tmp_path
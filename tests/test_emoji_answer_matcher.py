@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.emoji_answer_matcher import AMBIGUOUS, CORRECT, WRONG, match_answer
+
+
+@pytest.mark.parametrize("guess, answer", [
+    ("the lion king", "The Lion King"),
+    ("king lion", "The Lion King"),
+    ("Titanik", "Titanic"),
+    ("harry poter", "Harry Potter"),
+    ("Pokémon", "Pokemon"),
+])
+def test_exact_reordered_and_typo_answers_are_correct(guess, answer):
+    assert match_answer(guess, answer)[0] == CORRECT
+
+
+@pytest.mark.parametrize("guess, answer", [
+    ("bars", "Cars"),
+    ("paws", "Jaws"),
+    ("Toy Story 3", "Toy Story"),
+    ("Toy Story 2", "Toy Story 3"),
+    ("rocky ii", "Rocky"),
+    ("lion", "The Lion King"),
+])
+def test_other_words_and_sequels_are_left_to_the_llm(guess, answer):
+    assert match_answer(guess, answer)[0] == AMBIGUOUS
+
+
+def test_aliases_are_accepted():
+    assert match_answer("LOTR", "The Lord of the Rings", ["lotr"])[0] == CORRECT
+
+
+def test_unrelated_answer_is_wrong():
+    assert match_answer("pizza", "Titanic")[0] == WRONG
+    assert match_answer("???", "Titanic")[0] == WRONG
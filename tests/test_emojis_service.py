@@ -0,0 +1,30 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def emojis_service(bot_env):
+    return importlib.import_module("app.services.emojis_service")
+
+
+def test_failed_llm_validation_keeps_the_game(emojis_service, monkeypatch):
+    def failing_send_to_groq(*args, **kwargs):
+        raise TimeoutError("groq timed out")
+
+    monkeypatch.setattr(emojis_service, "send_to_groq", failing_send_to_groq)
+    service = emojis_service.EmojiService()
+    game = {"question": "🦁👑", "answer": "The Lion King", "aliases": [], "question_id": None}
+    service.active_games.set(7, game)
+
+    with pytest.raises(TimeoutError):
+        service.answer_game(7, "lion")  # a partial answer, only the LLM can judge it
+    assert service.active_games.get(7) == game
+
+
+def test_answered_game_is_gone(emojis_service):
+    service = emojis_service.EmojiService()
+    service.active_games.set(7, {"question": "🦁👑", "answer": "The Lion King", "aliases": [], "question_id": None})
+
+    assert service.answer_game(7, "the lion king")["correct"] is True
+    assert service.answer_game(7, "the lion king") is None
@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import threading
+import time
+
+import pytest
+
+from app.utils.ai_related.hedged_requests import LatencyTracker, hedged_call
+
+
+def test_hedge_returns_the_faster_answer_and_the_loser_still_completes():
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.3)
+        finished.set()
+        return "primary"
+
+    async def run():
+        result = await hedged_call(lambda: asyncio.to_thread(slow), lambda: asyncio.sleep(0, "secondary"), hedge_after=0.05)
+        # cancelling the primary task doesn't stop its thread
+        await asyncio.to_thread(finished.wait, 2)
+        return result
+
+    assert asyncio.run(run()) == "secondary"
+    assert finished.is_set()
+
+
+def test_primary_failure_fails_over_to_secondary():
+    async def failing():
+        raise RuntimeError("provider down")
+
+    assert asyncio.run(hedged_call(failing, lambda: asyncio.sleep(0, "secondary"))) == "secondary"
+
+
+def test_both_failing_raises_the_last_error():
+    async def failing():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged_call(failing, failing))
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1.0)
+    assert tracker.percentile(0.5, default=9.0) == 9.0
+    tracker.record(2.0)
+    tracker.record(3.0)
+    assert tracker.percentile(0.5, default=9.0) == 2.0
+
+
+@pytest.fixture
+def groq_api(bot_env, monkeypatch):
+    module = importlib.import_module("app.utils.ai_related.groq_api")
+    monkeypatch.setattr(module, "api_keys", ["key-1", "key-2", "key-3"])
+    monkeypatch.setattr(module, "Groq", lambda api_key: api_key)  # the "client" is its key
+    monkeypatch.setattr(module, "current_key_index", 0)
+    monkeypatch.setattr(module, "client", "key-1")
+    module.reset_token_count()
+    return module
+
+
+def run_in_threads(worker, threads_count=8):
+    barrier = threading.Barrier(threads_count)
+
+    def start():
+        barrier.wait()
+        worker()
+
+    threads = [threading.Thread(target=start) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_requests_count_every_token(groq_api, monkeypatch):
+    monkeypatch.setattr(groq_api, "TOKENS_PER_KEY_PER_MINUTE", 10 ** 9)
+
+    def worker():
+        for _ in range(2000):
+            groq_api.reserve_key(1)
+            groq_api.add_tokens(1)
+
+    run_in_threads(worker)
+    assert groq_api.token_count == 8 * 2000
+
+
+def test_concurrent_rotation_hands_out_matching_key_and_client(groq_api, monkeypatch):
+    monkeypatch.setattr(groq_api, "TOKENS_PER_KEY_PER_MINUTE", 50)
+    mismatches = []
+
+    def worker():
+        for _ in range(500):
+            key_index, key_client = groq_api.reserve_key(10)
+            if key_client != groq_api.api_keys[key_index]:
+                mismatches.append((key_index, key_client))
+            groq_api.add_tokens(10)
+
+    run_in_threads(worker)
+    assert not mismatches
@@ -0,0 +1,21 @@
+import pytest
+
+from app.discord_games.tic_tac_toe.bitboard import BoardState
+from app.discord_games.tic_tac_toe.engine import Engine
+
+
+@pytest.mark.parametrize("size, win_length", [(4, 4), (5, 4)])
+def test_node_budget_makes_the_search_repeatable(size, win_length):
+    state = BoardState(size=size, win_length=win_length).play(5).play(6)
+    results = [Engine(size, win_length, time_budget=60, max_nodes=5000).search(state, state.cells) for _ in range(2)]
+    assert results[0].moves == results[1].moves
+    assert results[0].depth == results[1].depth
+    assert results[0].nodes < 5000 + 256  # the budget is checked every 256 nodes
+
+
+def test_forced_win_is_found():
+    # X to move with three in the top row of a 4x4 board
+    state = BoardState(size=4, win_length=4).play(0).play(4).play(1).play(5).play(2).play(6)
+    best_position, score = Engine(4, 4, time_budget=5, max_nodes=5000).search(state).moves[0]
+    assert best_position == 3
+    assert score > 0
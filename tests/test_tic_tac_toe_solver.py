@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+import pytest
+
+pytest.importorskip("discord")
+
+from app.discord_games.tic_tac_toe import solver
+from app.discord_games.tic_tac_toe.bitboard import BoardState
+
+
+@pytest.fixture
+def tic_tac_toe(bot_env):
+    from app.discord_games.tic_tac_toe.tic_tac_toe import TicTacToe
+    game = TicTacToe()
+    # same minimax, memoized on the instance (its recursion goes through self.minimax), ~30s down to under a second
+    game.minimax = lru_cache(maxsize=None)(game.minimax)
+    return game
+
+
+@pytest.mark.parametrize("mark", ["X", "O"])
+def test_solver_matches_minimax_on_every_reachable_position(tic_tac_toe, mark):
+    solver.solve_all()
+    for mover, other in solver.reachable_positions():
+        state = BoardState(mover, other, 'X') if mark == 'X' else BoardState(other, mover, 'O')
+        expected = tic_tac_toe.find_best_moves_by_search(state)
+        assert solver.best_moves(state) == expected, f"{state.to_string()} {mark}"